@@ -1,7 +1,10 @@
 # config.py
 import os
+import re
+import sys
 import json
 import logging
+from collections import defaultdict
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
@@ -10,7 +13,13 @@ from cryptography.fernet import Fernet
 # Load environment variables from .env file
 load_dotenv()
 
-@dataclass
+# FOLLOWER_<index>_<setting>, e.g. FOLLOWER_2_NFO_LIMIT
+_FOLLOWER_ENV_RE = re.compile(r'^FOLLOWER_(\d+)_(.+)$')
+
+# slots drop the per-instance __dict__; dataclass only accepts it from 3.10
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class AccountConfig:
     """Configuration for a trading account with multi-segment support"""
     api_key: str
@@ -120,20 +129,30 @@ class SecureConfigManager:
         # Try to load from environment variables first
         follower_count = int(os.getenv('FOLLOWER_COUNT', '0'))
         
+        # Bucket FOLLOWER_<i>_* variables by index in a single environ scan
+        follower_env = defaultdict(dict)
+        if follower_count:
+            for key, value in os.environ.items():
+                match = _FOLLOWER_ENV_RE.match(key)
+                if match:
+                    follower_env[int(match.group(1))][match.group(2)] = value
+        
         for i in range(1, follower_count + 1):
+            env = follower_env.get(i, {})
+            
             # Load basic configuration
             follower = AccountConfig(
-                api_key=os.getenv(f'FOLLOWER_{i}_API_KEY', ''),
-                api_secret=self._decrypt_data(os.getenv(f'FOLLOWER_{i}_API_SECRET', '')),
-                access_token=self._decrypt_data(os.getenv(f'FOLLOWER_{i}_ACCESS_TOKEN', '')),
-                user_id=os.getenv(f'FOLLOWER_{i}_USER_ID', ''),
-                multiplier=float(os.getenv(f'FOLLOWER_{i}_MULTIPLIER', '1.0')),
-                max_position_size=int(os.getenv(f'FOLLOWER_{i}_MAX_POSITION', '1000')),
-                enabled=os.getenv(f'FOLLOWER_{i}_ENABLED', 'True').lower() == 'true'
+                api_key=env.get('API_KEY', ''),
+                api_secret=self._decrypt_data(env.get('API_SECRET', '')),
+                access_token=self._decrypt_data(env.get('ACCESS_TOKEN', '')),
+                user_id=env.get('USER_ID', ''),
+                multiplier=float(env.get('MULTIPLIER', '1.0')),
+                max_position_size=int(env.get('MAX_POSITION', '1000')),
+                enabled=env.get('ENABLED', 'True').lower() == 'true'
             )
             
             # Load segment-specific settings if available
-            enabled_segments_str = os.getenv(f'FOLLOWER_{i}_ENABLED_SEGMENTS', '')
+            enabled_segments_str = env.get('ENABLED_SEGMENTS', '')
             if enabled_segments_str:
                 follower.enabled_segments = [seg.strip() for seg in enabled_segments_str.split(',')]
             
@@ -143,14 +162,14 @@ class SecureConfigManager:
             
             for segment in ['NSE', 'BSE', 'NFO', 'MCX', 'BFO', 'CDS']:
                 # Load multiplier for this segment
-                multiplier_key = f'FOLLOWER_{i}_{segment}_MULTIPLIER'
-                if os.getenv(multiplier_key):
-                    segment_multipliers[segment] = float(os.getenv(multiplier_key))
+                multiplier = env.get(f'{segment}_MULTIPLIER')
+                if multiplier:
+                    segment_multipliers[segment] = float(multiplier)
                 
                 # Load limit for this segment
-                limit_key = f'FOLLOWER_{i}_{segment}_LIMIT'
-                if os.getenv(limit_key):
-                    segment_limits[segment] = int(os.getenv(limit_key))
+                limit = env.get(f'{segment}_LIMIT')
+                if limit:
+                    segment_limits[segment] = int(limit)
             
             # Apply segment-specific settings if any were found
             if segment_multipliers:
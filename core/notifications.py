@@ -13,10 +13,6 @@ Supports multiple notification channels:
 import os
 import logging
 import asyncio
-import aiohttp
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import json
@@ -78,6 +74,7 @@ class NotificationManager:
     
     async def __aenter__(self):
         """Async context manager entry"""
+        import aiohttp
         self.session = aiohttp.ClientSession()
         return self
     
@@ -289,6 +286,7 @@ class NotificationManager:
             }
             
             if not self.session:
+                import aiohttp
                 self.session = aiohttp.ClientSession()
             
             async with self.session.post(url, json=payload) as response:
@@ -303,6 +301,11 @@ class NotificationManager:
     def _send_email(self, subject: str, message: str):
         """Send email notification"""
         try:
+            # Only needed when email is enabled, so import on first use
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+            
             msg = MIMEMultipart()
             msg['From'] = self.config.email_user
             msg['To'] = self.config.email_to
@@ -331,6 +334,7 @@ class NotificationManager:
             }
             
             if not self.session:
+                import aiohttp
                 self.session = aiohttp.ClientSession()
             
             async with self.session.post(self.config.discord_webhook_url, json=payload) as response:
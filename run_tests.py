@@ -45,7 +45,6 @@ def check_dependencies():
     
     required_packages = [
         'kiteconnect',
-        'selenium',
         'requests',
         'cryptography',
         'python-dotenv'
@@ -11,35 +11,113 @@ import os
 import sys
 import logging
 import getpass
-from typing import Optional, Dict, Any
-from datetime import datetime, time as dt_time
-from kiteconnect import KiteConnect
-from kiteconnect.exceptions import KiteException
-from cryptography.fernet import Fernet
-from dotenv import load_dotenv
-import json
+import base64
+from functools import lru_cache
+from typing import Optional, Dict, Any, TYPE_CHECKING
+from datetime import datetime
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.token_cache import fernet_class, load_cached_token, save_cached_token
+
+# kiteconnect and cryptography are imported on first use so that aborting at the
+# confirmation prompts does not pay for loading them
+if TYPE_CHECKING:
+    from kiteconnect import KiteConnect
+
+# Market hours: 9:15 AM to 3:30 PM IST as minute-of-day, Monday to Friday
+_OPEN_MIN = 9 * 60 + 15
+_CLOSE_MIN = 15 * 60 + 30
+_WEEKEND = {5, 6}  # Saturday, Sunday
+
+_BANNER = "\n".join([
+    "=" * 80,
+    "🚀 ZERODHA COPY TRADING SYSTEM - REAL TRADING MODE",
+    "=" * 80,
+    "",
+    "⚠️  CRITICAL WARNING - REAL MONEY TRADING ⚠️",
+    "=" * 50,
+    "• This system will place REAL trades with REAL money",
+    "• Losses can be substantial and rapid",
+    "• Ensure you understand all risks before proceeding",
+    "• Test thoroughly with paper trading first",
+    "• You are responsible for all trades and outcomes",
+    "=" * 50,
+    "",
+    ""
+])
+
+# Template for the generated .env file
+_ENV_TEMPLATE = """# Zerodha Copy Trading System - LIVE TRADING Configuration
+# Generated on {generated_on}
+# WARNING: This configuration is for REAL MONEY trading
+
+# Master Account Configuration
+MASTER_API_KEY={master_api_key}
+MASTER_API_SECRET={master_api_secret}
+MASTER_ACCESS_TOKEN={master_access_token}
+MASTER_USER_ID={master_user_id}
+
+# Follower Accounts Configuration
+FOLLOWER_COUNT=1
+
+# Follower Account 1
+{follower_block}FOLLOWER_1_MULTIPLIER=0.1
+FOLLOWER_1_MAX_POSITION=100
+FOLLOWER_1_ENABLED=True
+
+# Multi-Segment Configuration
+FOLLOWER_1_ENABLED_SEGMENTS=NSE,BSE,NFO,MCX,BFO,CDS
+
+# Conservative Segment Multipliers for Initial Testing
+FOLLOWER_1_NSE_MULTIPLIER=0.1
+FOLLOWER_1_BSE_MULTIPLIER=0.1
+FOLLOWER_1_NFO_MULTIPLIER=0.05
+FOLLOWER_1_MCX_MULTIPLIER=0.02
+FOLLOWER_1_BFO_MULTIPLIER=0.05
+FOLLOWER_1_CDS_MULTIPLIER=0.1
+
+# Conservative Position Limits
+FOLLOWER_1_NSE_LIMIT=100
+FOLLOWER_1_BSE_LIMIT=100
+FOLLOWER_1_NFO_LIMIT=25
+FOLLOWER_1_MCX_LIMIT=5
+FOLLOWER_1_BFO_LIMIT=25
+FOLLOWER_1_CDS_LIMIT=50
+
+# System Configuration
+CHECK_INTERVAL=1
+MAX_RETRIES=3
+LOG_LEVEL=INFO
+PAPER_TRADING=False
+MAX_DAILY_TRADES=100
+RISK_MANAGEMENT=True
+
+# Security
+{encryption_line}
+# Notifications (Configure as needed)
+WHATSAPP_ENABLED=False
+TELEGRAM_ENABLED=False
+EMAIL_ENABLED=False
+DISCORD_ENABLED=False
+"""
+
+@lru_cache(maxsize=None)
+def _valid_fernet_key(key: str) -> bool:
+    """Check that key is url-safe base64 encoding 32 bytes, as Fernet requires"""
+    try:
+        return len(base64.urlsafe_b64decode(key)) == 32
+    except Exception:
+        return False
 
 def print_banner():
     """Print startup banner with warnings"""
-    print("=" * 80)
-    print("🚀 ZERODHA COPY TRADING SYSTEM - REAL TRADING MODE")
-    print("=" * 80)
-    print()
-    print("⚠️  CRITICAL WARNING - REAL MONEY TRADING ⚠️")
-    print("=" * 50)
-    print("• This system will place REAL trades with REAL money")
-    print("• Losses can be substantial and rapid")
-    print("• Ensure you understand all risks before proceeding")
-    print("• Test thoroughly with paper trading first")
-    print("• You are responsible for all trades and outcomes")
-    print("=" * 50)
-    print()
+    sys.stdout.write(_BANNER)
+    sys.stdout.flush()
 
 def confirm_real_trading():
     """Get user confirmation for real trading"""
-    print("🔐 REAL TRADING CONFIRMATION")
-    print("-" * 30)
-
     confirmations = [
         "I understand this is REAL money trading",
         "I have tested the system thoroughly with paper trading",
@@ -48,16 +126,27 @@ def confirm_real_trading():
         "I want to proceed with LIVE trading"
     ]
 
-    for i, confirmation in enumerate(confirmations, 1):
-        response = input(f"{i}. {confirmation} (yes/no): ").lower().strip()
-        if response not in ['yes', 'y']:
-            print(f"\n❌ Real trading cancelled at step {i}")
-            print("💡 Consider testing with paper trading first: PAPER_TRADING=True")
-            sys.exit(1)
+    lines = ["🔐 REAL TRADING CONFIRMATION", "-" * 30]
+    lines.extend(f"{i}. {confirmation}" for i, confirmation in enumerate(confirmations, 1))
+    print("\n".join(lines), flush=True)
+
+    response = input(f"\nType YES to confirm all {len(confirmations)} statements "
+                     "(or list numbers to reject, e.g. '2 4'): ").strip()
+
+    if response.upper() != 'YES':
+        rejected = [int(n) for n in response.replace(',', ' ').split()
+                    if n.isdigit() and 1 <= int(n) <= len(confirmations)]
+        if rejected:
+            step = min(rejected)
+            print(f"\n❌ Real trading cancelled at step {step}: {confirmations[step - 1]}")
+        else:
+            print("\n❌ Real trading cancelled - confirmations not accepted")
+        print("💡 Consider testing with paper trading first: PAPER_TRADING=True")
+        sys.exit(1)
 
     print("\n✅ All confirmations received - proceeding with LIVE trading setup")
 
-def decrypt_credentials(encryption_key: Optional[str] = None) -> Dict[str, str]:
+def decrypt_credentials(encryption_key: Optional[str] = None) -> Dict[str, Any]:
     """Decrypt the encrypted credentials"""
 
     # Your encrypted credentials
@@ -83,8 +172,16 @@ def decrypt_credentials(encryption_key: Optional[str] = None) -> Dict[str, str]:
             'api_secret': encrypted_api_secret
         }
 
+    if not _valid_fernet_key(encryption_key):
+        print("❌ Invalid encryption key - expected a 44-character Fernet key")
+        print("⚠️ Trying credentials as plain text...")
+        return {
+            'api_key': encrypted_api_key,
+            'api_secret': encrypted_api_secret
+        }
+
     try:
-        cipher = Fernet(encryption_key.encode())
+        cipher = fernet_class()(encryption_key.encode())
 
         api_key = cipher.decrypt(encrypted_api_key.encode()).decode()
         api_secret = cipher.decrypt(encrypted_api_secret.encode()).decode()
@@ -95,7 +192,8 @@ def decrypt_credentials(encryption_key: Optional[str] = None) -> Dict[str, str]:
         return {
             'api_key': api_key,
             'api_secret': api_secret,
-            'encryption_key': encryption_key
+            'encryption_key': encryption_key,
+            'cipher': cipher
         }
 
     except Exception as e:
@@ -107,38 +205,63 @@ def decrypt_credentials(encryption_key: Optional[str] = None) -> Dict[str, str]:
             'api_secret': encrypted_api_secret
         }
 
-def generate_access_token(api_key: str, api_secret: str) -> Optional[Dict[str, str]]:
-    """Generate fresh access token for trading"""
+def _reuse_cached_token(kite: 'KiteConnect', api_key: str, encryption_key: Optional[str] = None):
+    """Try today's cached token on kite; return (access_token, profile) or (None, None)"""
+    access_token = load_cached_token(api_key, encryption_key)
+    if not access_token:
+        return None, None
+
+    try:
+        kite.set_access_token(access_token)
+        profile = kite.profile()
+        print("♻️ Reusing today's cached access token")
+        return access_token, profile
+    except Exception:
+        print("ℹ️ Cached access token is no longer valid - login required")
+        return None, None
+
+def generate_access_token(api_key: str, api_secret: str, encryption_key: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """Generate fresh access token for trading (reuses today's cached token when valid)"""
 
     print("\n🔑 ACCESS TOKEN GENERATION")
     print("-" * 30)
 
+    if not encryption_key:
+        encryption_key = os.getenv('ENCRYPTION_KEY')
+
     try:
+        from kiteconnect import KiteConnect
+
         kite = KiteConnect(api_key=api_key)
-        login_url = kite.login_url()
+        access_token, profile = _reuse_cached_token(kite, api_key, encryption_key)
 
-        print("📱 Please complete the login process:")
-        print(f"1. Visit: {login_url}")
-        print("2. Login with your Zerodha credentials")
-        print("3. Copy the 'request_token' from the callback URL")
-        print()
+        if not access_token:
+            login_url = kite.login_url()
 
-        request_token = input("Enter request_token: ").strip()
+            print("📱 Please complete the login process:")
+            print(f"1. Visit: {login_url}")
+            print("2. Login with your Zerodha credentials")
+            print("3. Copy the 'request_token' from the callback URL")
+            print()
 
-        if not request_token:
-            print("❌ Request token is required!")
-            return None
+            request_token = input("Enter request_token: ").strip()
 
-        # Generate session
-        print("🔄 Generating access token...")
-        data = kite.generate_session(request_token, api_secret=api_secret)
-        access_token = data["access_token"]
+            if not request_token:
+                print("❌ Request token is required!")
+                return None
 
-        # Verify token works
-        kite.set_access_token(access_token)
-        profile = kite.profile()
+            # Generate session
+            print("🔄 Generating access token...")
+            data = kite.generate_session(request_token, api_secret=api_secret)
+            access_token = data["access_token"]
+
+            # Verify token works
+            kite.set_access_token(access_token)
+            profile = kite.profile()
+
+            save_cached_token(api_key, access_token, encryption_key)
+            print(f"✅ Access token generated successfully!")
 
-        print(f"✅ Access token generated successfully!")
         print(f"👤 Account: {profile['user_name']} ({profile['user_id']})")
         print(f"📧 Email: {profile['email']}")
         print(f"📱 Mobile: {profile['phone']}")
@@ -154,11 +277,10 @@ def generate_access_token(api_key: str, api_secret: str) -> Optional[Dict[str, s
         print(f"❌ Access token generation failed: {e}")
         return None
 
-def check_account_margins(kite: KiteConnect) -> bool:
+def check_account_margins(kite: 'KiteConnect') -> bool:
     """Check if account has sufficient margins"""
 
-    print("\n💰 MARGIN CHECK")
-    print("-" * 30)
+    lines = ["\n💰 MARGIN CHECK", "-" * 30]
 
     try:
         margins = kite.margins()
@@ -169,28 +291,31 @@ def check_account_margins(kite: KiteConnect) -> bool:
             available_cash = equity.get('available', {}).get('cash', 0)
             live_balance = equity.get('available', {}).get('live_balance', 0)
 
-            print(f"💵 Equity Segment:")
-            print(f"   Available Cash: ₹{available_cash:,.2f}")
-            print(f"   Total Margin: ₹{live_balance:,.2f}")
+            lines.append("💵 Equity Segment:")
+            lines.append(f"   Available Cash: ₹{available_cash:,.2f}")
+            lines.append(f"   Total Margin: ₹{live_balance:,.2f}")
 
             if available_cash < 1000:
-                print("⚠️ WARNING: Low cash balance in equity segment")
+                lines.append("⚠️ WARNING: Low cash balance in equity segment")
 
         # Check commodity margins
         commodity = margins.get('commodity', {})
         if commodity:
             available_cash = commodity.get('available', {}).get('cash', 0)
-            print(f"🌾 Commodity Segment:")
-            print(f"   Available Cash: ₹{available_cash:,.2f}")
+            lines.append("🌾 Commodity Segment:")
+            lines.append(f"   Available Cash: ₹{available_cash:,.2f}")
 
-        print("✅ Margin check completed")
+        lines.append("✅ Margin check completed")
         return True
 
     except Exception as e:
-        print(f"❌ Margin check failed: {e}")
+        lines.append(f"❌ Margin check failed: {e}")
         return False
 
-def setup_follower_account():
+    finally:
+        print("\n".join(lines))
+
+def setup_follower_account(encryption_key: Optional[str] = None):
     """Setup follower account (if different from master)"""
 
     print("\n👥 FOLLOWER ACCOUNT SETUP")
@@ -210,21 +335,32 @@ def setup_follower_account():
         print("⚠️ Follower credentials not provided - using master account")
         return None
 
+    if not encryption_key:
+        encryption_key = os.getenv('ENCRYPTION_KEY')
+
     # Generate follower access token
     try:
+        from kiteconnect import KiteConnect
+
         kite = KiteConnect(api_key=follower_api_key)
-        login_url = kite.login_url()
+        access_token, profile = _reuse_cached_token(kite, follower_api_key, encryption_key)
 
-        print(f"📱 Follower login: {login_url}")
-        request_token = input("Enter follower request_token: ").strip()
+        if not access_token:
+            login_url = kite.login_url()
 
-        if request_token:
-            data = kite.generate_session(request_token, api_secret=follower_api_secret)
-            access_token = data["access_token"]
+            print(f"📱 Follower login: {login_url}")
+            request_token = input("Enter follower request_token: ").strip()
 
-            kite.set_access_token(access_token)
-            profile = kite.profile()
+            if request_token:
+                data = kite.generate_session(request_token, api_secret=follower_api_secret)
+                access_token = data["access_token"]
 
+                kite.set_access_token(access_token)
+                profile = kite.profile()
+
+                save_cached_token(follower_api_key, access_token, encryption_key)
+
+        if access_token:
             print(f"✅ Follower account: {profile['user_name']} ({profile['user_id']})")
 
             return {
@@ -239,135 +375,101 @@ def setup_follower_account():
 
     return None
 
-def update_env_file(master_data: Dict[str, str], follower_data: Optional[Dict[str, str]] = None, encryption_key: Optional[str] = None):
+def update_env_file(master_data: Dict[str, str], follower_data: Optional[Dict[str, str]] = None,
+                    encryption_key: Optional[str] = None, cipher: Optional[Any] = None):
     """Update .env file with real credentials"""
 
     print("\n📁 UPDATING CONFIGURATION")
     print("-" * 30)
 
+    # Build the cipher once and reuse it for every field. With a key supplied,
+    # failing to encrypt must abort rather than write secrets in plain text.
+    if cipher is None and encryption_key:
+        try:
+            cipher = fernet_class()(encryption_key.encode())
+        except Exception as e:
+            raise ValueError(f"Cannot encrypt credentials with the given encryption key: {e}") from e
+
     # Encrypt function
     def encrypt_if_key(data: str) -> str:
-        if encryption_key:
-            try:
-                cipher = Fernet(encryption_key.encode())
-                return cipher.encrypt(data.encode()).decode()
-            except:
-                return data
+        if cipher:
+            return cipher.encrypt(data.encode()).decode()
         return data
 
-    env_content = f"""# Zerodha Copy Trading System - LIVE TRADING Configuration
-# Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-# WARNING: This configuration is for REAL MONEY trading
-
-# Master Account Configuration
-MASTER_API_KEY={master_data['api_key']}
-MASTER_API_SECRET={encrypt_if_key(master_data['api_secret'])}
-MASTER_ACCESS_TOKEN={encrypt_if_key(master_data['access_token'])}
-MASTER_USER_ID={master_data['user_id']}
-
-# Follower Accounts Configuration
-FOLLOWER_COUNT=1
-
-# Follower Account 1
-"""
+    master_api_secret = encrypt_if_key(master_data['api_secret'])
+    master_access_token = encrypt_if_key(master_data['access_token'])
 
     if follower_data:
-        env_content += f"""FOLLOWER_1_API_KEY={follower_data['api_key']}
-FOLLOWER_1_API_SECRET={encrypt_if_key(follower_data['api_secret'])}
-FOLLOWER_1_ACCESS_TOKEN={encrypt_if_key(follower_data['access_token'])}
-FOLLOWER_1_USER_ID={follower_data['user_id']}
-"""
+        follower_api_key = follower_data['api_key']
+        follower_api_secret = encrypt_if_key(follower_data['api_secret'])
+        follower_access_token = encrypt_if_key(follower_data['access_token'])
+        follower_user_id = follower_data['user_id']
     else:
         # Use master account as follower
-        env_content += f"""FOLLOWER_1_API_KEY={master_data['api_key']}
-FOLLOWER_1_API_SECRET={encrypt_if_key(master_data['api_secret'])}
-FOLLOWER_1_ACCESS_TOKEN={encrypt_if_key(master_data['access_token'])}
-FOLLOWER_1_USER_ID={master_data['user_id']}
-"""
-
-    env_content += """FOLLOWER_1_MULTIPLIER=0.1
-FOLLOWER_1_MAX_POSITION=100
-FOLLOWER_1_ENABLED=True
-
-# Multi-Segment Configuration
-FOLLOWER_1_ENABLED_SEGMENTS=NSE,BSE,NFO,MCX,BFO,CDS
-
-# Conservative Segment Multipliers for Initial Testing
-FOLLOWER_1_NSE_MULTIPLIER=0.1
-FOLLOWER_1_BSE_MULTIPLIER=0.1
-FOLLOWER_1_NFO_MULTIPLIER=0.05
-FOLLOWER_1_MCX_MULTIPLIER=0.02
-FOLLOWER_1_BFO_MULTIPLIER=0.05
-FOLLOWER_1_CDS_MULTIPLIER=0.1
-
-# Conservative Position Limits
-FOLLOWER_1_NSE_LIMIT=100
-FOLLOWER_1_BSE_LIMIT=100
-FOLLOWER_1_NFO_LIMIT=25
-FOLLOWER_1_MCX_LIMIT=5
-FOLLOWER_1_BFO_LIMIT=25
-FOLLOWER_1_CDS_LIMIT=50
-
-# System Configuration
-CHECK_INTERVAL=1
-MAX_RETRIES=3
-LOG_LEVEL=INFO
-PAPER_TRADING=False
-MAX_DAILY_TRADES=100
-RISK_MANAGEMENT=True
-
-# Security
-"""
-
-    if encryption_key:
-        env_content += f"ENCRYPTION_KEY={encryption_key}\n"
-
-    env_content += """
-# Notifications (Configure as needed)
-WHATSAPP_ENABLED=False
-TELEGRAM_ENABLED=False
-EMAIL_ENABLED=False
-DISCORD_ENABLED=False
-"""
-
-    # Write to file
-    with open('.env', 'w') as f:
-        f.write(env_content)
+        follower_api_key = master_data['api_key']
+        follower_api_secret = master_api_secret
+        follower_access_token = master_access_token
+        follower_user_id = master_data['user_id']
+
+    env_content = _ENV_TEMPLATE.format(
+        generated_on=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        master_api_key=master_data['api_key'],
+        master_api_secret=master_api_secret,
+        master_access_token=master_access_token,
+        master_user_id=master_data['user_id'],
+        follower_block=(
+            f"FOLLOWER_1_API_KEY={follower_api_key}\n"
+            f"FOLLOWER_1_API_SECRET={follower_api_secret}\n"
+            f"FOLLOWER_1_ACCESS_TOKEN={follower_access_token}\n"
+            f"FOLLOWER_1_USER_ID={follower_user_id}\n"
+        ),
+        encryption_line=f"ENCRYPTION_KEY={encryption_key}\n" if encryption_key else ""
+    )
+
+    # Write to a temp file with owner-only permissions, then atomically replace .env
+    tmp_path = '.env.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.write(fd, env_content.encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, '.env')
 
     print("✅ Configuration file updated")
-    print("🔒 Credentials have been saved securely")
+    if cipher:
+        print("🔒 Credentials have been saved securely")
+    else:
+        print("⚠️ No encryption key - credentials saved in plain text (owner-only .env)")
 
 def check_market_hours() -> bool:
     """Check if markets are open"""
 
-    print("\n🕐 MARKET HOURS CHECK")
-    print("-" * 30)
-
     now = datetime.now()
-    current_time = now.time()
-
-    # Market hours: 9:15 AM to 3:30 PM IST (Monday to Friday)
-    market_open = dt_time(9, 15)
-    market_close = dt_time(15, 30)
+    now_min = now.hour * 60 + now.minute
 
-    is_weekday = now.weekday() < 5  # Monday = 0, Friday = 4
-    is_market_hours = market_open <= current_time <= market_close
+    is_weekday = now.weekday() not in _WEEKEND
+    is_open = is_weekday and _OPEN_MIN <= now_min <= _CLOSE_MIN
 
-    print(f"📅 Current Time: {now.strftime('%Y-%m-%d %H:%M:%S')} ({now.strftime('%A')})")
-    print(f"📈 Market Hours: 09:15 - 15:30 IST (Mon-Fri)")
+    lines = [
+        "\n🕐 MARKET HOURS CHECK",
+        "-" * 30,
+        f"📅 Current Time: {now.strftime('%Y-%m-%d %H:%M:%S')} ({now.strftime('%A')})",
+        "📈 Market Hours: 09:15 - 15:30 IST (Mon-Fri)"
+    ]
 
-    if is_weekday and is_market_hours:
-        print("✅ Markets are OPEN - Live trading is active")
-        return True
+    if is_open:
+        lines.append("✅ Markets are OPEN - Live trading is active")
     elif is_weekday:
-        if current_time < market_open:
-            print(f"⏰ Markets will open at 09:15 (in {market_open.hour * 60 + market_open.minute - current_time.hour * 60 - current_time.minute} minutes)")
+        if now_min < _OPEN_MIN:
+            lines.append(f"⏰ Markets will open at 09:15 (in {_OPEN_MIN - now_min} minutes)")
         else:
-            print("🔒 Markets are CLOSED - Will resume tomorrow at 09:15")
-        return False
+            lines.append("🔒 Markets are CLOSED - Will resume tomorrow at 09:15")
     else:
-        print("📅 Markets are CLOSED - Weekend")
-        return False
+        lines.append("📅 Markets are CLOSED - Weekend")
+
+    print("\n".join(lines))
+    return is_open
 
 def start_trading_system():
     """Start the actual trading system"""
@@ -410,27 +512,30 @@ def main():
         api_key = credentials['api_key']
         api_secret = credentials['api_secret']
         encryption_key = credentials.get('encryption_key')
+        cipher = credentials.get('cipher')
 
         # Generate access token
-        master_data = generate_access_token(api_key, api_secret)
+        master_data = generate_access_token(api_key, api_secret, encryption_key)
         if not master_data:
             print("❌ Failed to generate access token")
             sys.exit(1)
 
         # Check account margins
+        from kiteconnect import KiteConnect
+
         kite = KiteConnect(api_key=api_key)
         kite.set_access_token(master_data['access_token'])
         check_account_margins(kite)
 
         # Setup follower account
-        follower_data = setup_follower_account()
+        follower_data = setup_follower_account(encryption_key)
 
         # Update configuration
         master_data.update({
             'api_key': api_key,
             'api_secret': api_secret
         })
-        update_env_file(master_data, follower_data, encryption_key)
+        update_env_file(master_data, follower_data, encryption_key, cipher)
 
         # Check market hours
         market_open = check_market_hours()
@@ -0,0 +1,29 @@
+"""
+Shared pytest fixtures for the test suite
+========================================
+"""
+
+import pytest
+
+# Mock credentials for AutomatedKiteSystem, installed once per session
+TEST_ENV = {
+    'AUTOMATED_USER_ID': 'test_user_id',
+    'AUTOMATED_PASSWORD': 'test_password',
+    'AUTOMATED_API_KEY': 'test_api_key',
+    'AUTOMATED_API_SECRET': 'test_api_secret',
+    'AUTOMATED_AUTH_SECRET': 'test_auth_secret',
+    'TELEGRAM_BOT_TOKEN': 'test_bot_token',
+    'TELEGRAM_CHAT_ID': 'test_chat_id'
+}
+
+@pytest.fixture(scope="session", autouse=True)
+def kite_env():
+    """Install the mock credentials for the whole session
+
+    Tests that need different values layer monkeypatch.setenv/delenv on
+    top; monkeypatch restores them without tearing this fixture down.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        for key, value in TEST_ENV.items():
+            mp.setenv(key, value)
+        yield TEST_ENV
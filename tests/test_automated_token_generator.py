@@ -14,508 +14,544 @@ Test Coverage:
 - Security features
 """
 
-import unittest
-import os
-import sys
+import re
 import json
-import tempfile
-from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
+import copy
+import collections
+import threading
+import time
+import pytest
+from concurrent.futures import wait
+from dataclasses import dataclass
+from types import MappingProxyType
+from unittest.mock import Mock, MagicMock, create_autospec
+from hypothesis import assume, given, settings, strategies as st
 
-# Add the project root to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Completed RELIANCE buy as returned by kite.orders(); read-only so tests can share it
+_SAMPLE_ORDER = MappingProxyType({
+    'order_id': '12345',
+    'status': 'COMPLETE',
+    'tradingsymbol': 'RELIANCE',
+    'transaction_type': 'BUY',
+    'quantity': 100,
+    'price': 2500.50
+})
 
-from utils.automated_token_generator import AutomatedKiteSystem
+# Arbitrary orders for the generate_order_id properties
+_ORDERS = st.fixed_dictionaries({
+    'order_id': st.text(min_size=1, max_size=20),
+    'status': st.sampled_from(['COMPLETE', 'OPEN', 'REJECTED']),
+    'tradingsymbol': st.text(min_size=1, max_size=10)
+})
 
-class TestAutomatedKiteSystem(unittest.TestCase):
+# Expected trade messages, matched in a single pass each
+_BUY_PATTERN = re.compile(r'🟢.*BUY.*RELIANCE.*100.*2,500\.50.*250,050\.00', re.S)
+_SELL_PATTERN = re.compile(r'🔴.*SELL.*TCS.*50.*3,500\.75.*175,037\.50', re.S)
+_AVERAGE_PRICE_PATTERN = re.compile(r'1,500\.25.*37,506\.25', re.S)
+_FALLBACK_PATTERN = re.compile(r'^Trade Alert: N/A - N/A$')
+
+# Enough processed order IDs to push monitor_trades past its cleanup threshold
+_SIXTY_ORDERS = tuple((f"order_{i}", "COMPLETE", "RELIANCE") for i in range(60))
+
+@pytest.fixture(scope="session")
+def AutomatedKiteSystem():
+    """The class under test, imported on first use rather than at collection"""
+    from utils.automated_token_generator import AutomatedKiteSystem as _AutomatedKiteSystem
+    return _AutomatedKiteSystem
+
+@pytest.fixture(scope="module")
+def _system_template(AutomatedKiteSystem):
+    """Single AutomatedKiteSystem built once per module"""
+    return AutomatedKiteSystem()
+
+@pytest.fixture
+def system(_system_template):
+    """Shallow copy of the template with its mutable state reset"""
+    s = copy.copy(_system_template)
+    s.kite = None
+    s.processed_orders = collections.OrderedDict()
+    s._inflight_orders = set()
+    s._retry_timer = None
+    s._retries_stopped = False
+    s.trade_count = 0
+    yield s
+    s._stop_retries()
+
+# automated_token_generation imports pyotp and kiteconnect lazily, so these patch at the source
+
+@pytest.fixture
+def fixed_otp(monkeypatch):
+    """TOTP that always yields 123456 (the test secret is not valid base32)"""
+    mock_totp = Mock()
+    mock_totp.return_value.now.return_value = '123456'
+    monkeypatch.setattr('pyotp.TOTP', mock_totp)
+    return mock_totp
+
+def _login_response(json_data=None, location=None):
+    """Kite login API response; a location makes it a redirect"""
+    response = Mock(status_code=302 if location else 200, headers={})
+    response.json.return_value = json_data or {}
+    if location:
+        response.headers['Location'] = location
+    return response
+
+@pytest.fixture
+def login_session(system, fixed_otp, monkeypatch):
+    """Login session that accepts the password and OTP and redirects with a request_token"""
+    # Depends on system so the template's own requests.Session is built unpatched
+    session = MagicMock()
+    session.__enter__.return_value = session
+    session.post.side_effect = [
+        _login_response({'data': {'request_id': 'test_request_id'}}),
+        _login_response()
+    ]
+    session.get.return_value = _login_response(
+        location="https://127.0.0.1/?status=success&request_token=test_token")
+    monkeypatch.setattr('utils.automated_token_generator.requests.Session', Mock(return_value=session))
+    return session
+
+@pytest.fixture(scope="module")
+def _kite_mock_template():
+    """Autospec'd KiteConnect instance, introspected once per module"""
+    from kiteconnect import KiteConnect
+    return create_autospec(KiteConnect, instance=True)
+
+@pytest.fixture
+def kite_mock(_kite_mock_template, monkeypatch):
+    """Reset KiteConnect mock, also returned by the patched constructor"""
+    # Copies of a mock share their child mocks, so reset the template instead
+    _kite_mock_template.reset_mock(return_value=True, side_effect=True)
+    monkeypatch.setattr('kiteconnect.KiteConnect',
+                        Mock(return_value=_kite_mock_template))
+    return _kite_mock_template
+
+@pytest.fixture
+def mock_kite(kite_mock):
+    """KiteConnect mock whose order book holds the sample order"""
+    kite_mock.orders.return_value = [_SAMPLE_ORDER]
+    return kite_mock
+
+@pytest.fixture
+def mock_kite_err(mock_kite):
+    """KiteConnect mock whose orders() call fails"""
+    mock_kite.orders.side_effect = Exception("API Error")
+    return mock_kite
+
+@dataclass
+class WorkflowMocks:
+    """Collaborators patched for an end-to-end run"""
+    login: Mock
+    kite: Mock
+    post: Mock
+
+@pytest.fixture
+def mocks_bundle(system, login_session, mock_kite, monkeypatch):
+    """Kite login API, KiteConnect and a Telegram endpoint that accepts every message"""
+    mock_post = Mock(return_value=Mock(status_code=200))
+    monkeypatch.setattr(system.http, 'post', mock_post)
+    return WorkflowMocks(login=login_session, kite=mock_kite, post=mock_post)
+
+class TestAutomatedKiteSystem:
     """Test cases for AutomatedKiteSystem class"""
-    
-    def setUp(self):
-        """Set up test environment with mock credentials"""
-        # Mock environment variables
-        self.test_env = {
-            'AUTOMATED_USER_ID': 'test_user_id',
-            'AUTOMATED_PASSWORD': 'test_password',
-            'AUTOMATED_API_KEY': 'test_api_key',
-            'AUTOMATED_API_SECRET': 'test_api_secret',
-            'AUTOMATED_AUTH_SECRET': 'test_auth_secret',
-            'TELEGRAM_BOT_TOKEN': 'test_bot_token',
-            'TELEGRAM_CHAT_ID': 'test_chat_id'
-        }
-        
-        # Patch environment variables
-        self.env_patcher = patch.dict(os.environ, self.test_env)
-        self.env_patcher.start()
-        
-        # Create temporary directory for test files
-        self.test_dir = tempfile.mkdtemp()
-        self.original_cwd = os.getcwd()
-        os.chdir(self.test_dir)
-    
-    def tearDown(self):
-        """Clean up after tests"""
-        self.env_patcher.stop()
-        os.chdir(self.original_cwd)
-        # Clean up test files
-        import shutil
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
-    def test_initialization_with_valid_credentials(self):
+
+    def test_initialization_with_valid_credentials(self, system):
         """Test system initialization with valid credentials"""
-        system = AutomatedKiteSystem()
-        
-        self.assertEqual(system.USER_ID, 'test_user_id')
-        self.assertEqual(system.PASSWORD, 'test_password')
-        self.assertEqual(system.API_KEY, 'test_api_key')
-        self.assertEqual(system.API_SECRET, 'test_api_secret')
-        self.assertEqual(system.AUTH_SECRET, 'test_auth_secret')
-        self.assertEqual(system.TELEGRAM_TOKEN, 'test_bot_token')
-        self.assertEqual(system.TELEGRAM_CHAT_ID, 'test_chat_id')
-    
-    def test_initialization_with_missing_credentials(self):
+        assert system.USER_ID == 'test_user_id'
+        assert system.PASSWORD == 'test_password'
+        assert system.API_KEY == 'test_api_key'
+        assert system.API_SECRET == 'test_api_secret'
+        assert system.AUTH_SECRET == 'test_auth_secret'
+        assert system.TELEGRAM_TOKEN == 'test_bot_token'
+        assert system.TELEGRAM_CHAT_ID == 'test_chat_id'
+
+    def test_initialization_with_missing_credentials(self, AutomatedKiteSystem, kite_env, monkeypatch):
         """Test system initialization with missing credentials"""
-        # Remove one credential
-        with patch.dict(os.environ, {}, clear=True):
-            with self.assertRaises(ValueError) as context:
-                AutomatedKiteSystem()
-            
-            self.assertIn("Missing required credentials", str(context.exception))
-    
-    def test_validate_credentials_success(self):
+        for key in kite_env:
+            monkeypatch.delenv(key, raising=False)
+
+        with pytest.raises(ValueError, match="Missing required credentials"):
+            AutomatedKiteSystem()
+
+    def test_validate_credentials_success(self, system):
         """Test credential validation with valid credentials"""
-        system = AutomatedKiteSystem()
-        # Should not raise any exception
-        self.assertTrue(True)
-    
-    def test_validate_credentials_failure(self):
+        # Building the fixture must not raise any exception
+        assert system is not None
+
+    def test_validate_credentials_failure(self, AutomatedKiteSystem, monkeypatch):
         """Test credential validation with missing credentials"""
-        with patch.dict(os.environ, {}, clear=True):
-            with self.assertRaises(ValueError):
-                AutomatedKiteSystem()
-    
-    @patch('utils.automated_token_generator.pyotp.TOTP')
-    def test_otp_generation(self, mock_totp):
-        """Test OTP generation"""
-        # Mock TOTP
-        mock_totp_instance = Mock()
-        mock_totp_instance.now.return_value = '123456'
-        mock_totp.return_value = mock_totp_instance
-        
-        system = AutomatedKiteSystem()
-        
-        # Test OTP generation
-        totp = pyotp.TOTP(system.AUTH_SECRET)
-        otp = totp.now()
-        
-        self.assertEqual(otp, '123456')
-        mock_totp.assert_called_once_with(system.AUTH_SECRET)
-    
-    @patch('utils.automated_token_generator.requests.post')
-    def test_send_trade_notification_success(self, mock_post):
+        monkeypatch.delenv('AUTOMATED_AUTH_SECRET')
+
+        with pytest.raises(ValueError):
+            AutomatedKiteSystem()
+
+    def test_otp_generation(self, system, fixed_otp, login_session, kite_mock,
+                            tmp_path, monkeypatch):
+        """Test the login submits the TOTP generated from the configured secret"""
+        monkeypatch.chdir(tmp_path)
+        kite_mock.generate_session.return_value = {"access_token": "test_access_token"}
+
+        system.automated_token_generation()
+
+        fixed_otp.assert_called_once_with(system.AUTH_SECRET)
+        assert login_session.post.call_args_list[1].kwargs['data']['twofa_value'] == '123456'
+
+    def test_send_trade_notification_success(self, system, monkeypatch):
         """Test successful trade notification"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_post.return_value = mock_response
-        
-        system = AutomatedKiteSystem()
+        mock_post = Mock(return_value=Mock(status_code=200))
+        monkeypatch.setattr(system.http, 'post', mock_post)
+
         result = system.send_trade_notification("Test message")
-        
-        self.assertTrue(result)
+
+        assert result is True
         mock_post.assert_called_once()
-    
-    @patch('utils.automated_token_generator.requests.post')
-    def test_send_trade_notification_failure(self, mock_post):
+
+    def test_send_trade_notification_failure(self, system, monkeypatch):
         """Test failed trade notification"""
-        mock_response = Mock()
-        mock_response.status_code = 400
-        mock_post.return_value = mock_response
-        
-        system = AutomatedKiteSystem()
+        mock_post = Mock(return_value=Mock(status_code=400))
+        monkeypatch.setattr(system.http, 'post', mock_post)
+
         result = system.send_trade_notification("Test message")
-        
-        self.assertFalse(result)
+
+        assert result is False
         mock_post.assert_called_once()
-    
-    def test_send_trade_notification_no_credentials(self):
+
+    def test_send_trade_notification_no_credentials(self, system, monkeypatch):
         """Test trade notification without Telegram credentials"""
-        # Create system without Telegram credentials
-        with patch.dict(os.environ, {k: v for k, v in self.test_env.items() 
-                                   if not k.startswith('TELEGRAM')}):
-            system = AutomatedKiteSystem()
-            result = system.send_trade_notification("Test message")
-            
-            self.assertFalse(result)
-    
-    def test_format_trade_message_buy(self):
-        """Test trade message formatting for BUY orders"""
-        system = AutomatedKiteSystem()
-        
-        order = {
-            'tradingsymbol': 'RELIANCE',
-            'transaction_type': 'BUY',
-            'quantity': 100,
-            'price': 2500.50
-        }
-        
-        message = system.format_trade_message(order)
-        
-        self.assertIn('🟢', message)
-        self.assertIn('BUY', message)
-        self.assertIn('RELIANCE', message)
-        self.assertIn('100', message)
-        self.assertIn('2500.50', message)
-        self.assertIn('250,050.00', message)  # Total calculation
-    
-    def test_format_trade_message_sell(self):
-        """Test trade message formatting for SELL orders"""
-        system = AutomatedKiteSystem()
-        
-        order = {
-            'tradingsymbol': 'TCS',
-            'transaction_type': 'SELL',
-            'quantity': 50,
-            'price': 3500.75
-        }
-        
-        message = system.format_trade_message(order)
-        
-        self.assertIn('🔴', message)
-        self.assertIn('SELL', message)
-        self.assertIn('TCS', message)
-        self.assertIn('50', message)
-        self.assertIn('3500.75', message)
-        self.assertIn('175,037.50', message)  # Total calculation
-    
-    def test_format_trade_message_with_average_price(self):
-        """Test trade message formatting with average price"""
-        system = AutomatedKiteSystem()
-        
-        order = {
-            'tradingsymbol': 'INFY',
-            'transaction_type': 'BUY',
-            'quantity': 25,
-            'price': 0,  # No price
-            'average_price': 1500.25
-        }
-        
-        message = system.format_trade_message(order)
-        
-        self.assertIn('1500.25', message)
-        self.assertIn('37,506.25', message)  # Total calculation with average price
-    
-    def test_format_trade_message_error_handling(self):
-        """Test trade message formatting error handling"""
-        system = AutomatedKiteSystem()
-        
-        # Test with invalid order data
-        order = {}
+        # The constructor rejects a missing Telegram config, so clear it afterwards
+        system.TELEGRAM_TOKEN = ''
+        system.TELEGRAM_CHAT_ID = ''
+        mock_post = Mock()
+        monkeypatch.setattr(system.http, 'post', mock_post)
+
+        result = system.send_trade_notification("Test message")
+
+        assert result is False
+        mock_post.assert_not_called()
+
+    @pytest.mark.parametrize("order,pattern", [
+        pytest.param(
+            {'tradingsymbol': 'RELIANCE', 'transaction_type': 'BUY', 'quantity': 100, 'price': 2500.50},
+            _BUY_PATTERN,
+            id="buy"),
+        pytest.param(
+            {'tradingsymbol': 'TCS', 'transaction_type': 'SELL', 'quantity': 50, 'price': 3500.75},
+            _SELL_PATTERN,
+            id="sell"),
+        pytest.param(
+            # No price, so the total falls back to the average price
+            {'tradingsymbol': 'INFY', 'transaction_type': 'BUY', 'quantity': 25, 'price': 0,
+             'average_price': 1500.25},
+            _AVERAGE_PRICE_PATTERN,
+            id="average_price"),
+        pytest.param(
+            # Non-numeric data drops to the plain-text fallback
+            {'quantity': 'invalid', 'price': 'invalid'},
+            _FALLBACK_PATTERN,
+            id="invalid_order"),
+    ])
+    def test_format_trade_message(self, system, order, pattern):
+        """Test trade message formatting"""
         message = system.format_trade_message(order)
-        
-        self.assertIn('Trade Alert', message)
-        self.assertIn('N/A', message)
-    
-    def test_generate_order_id(self):
+
+        assert pattern.search(message), f"{pattern.pattern!r} does not match {message!r}"
+
+    def test_generate_order_id(self, system):
         """Test order ID generation"""
-        system = AutomatedKiteSystem()
-        
-        order = {
-            'order_id': '12345',
-            'status': 'COMPLETE',
-            'tradingsymbol': 'RELIANCE'
-        }
-        
-        order_id = system.generate_order_id(order)
-        
-        self.assertIsInstance(order_id, str)
-        self.assertEqual(len(order_id), 12)  # MD5 hash truncated to 12 chars
-    
-    def test_generate_order_id_consistency(self):
-        """Test order ID generation consistency"""
-        system = AutomatedKiteSystem()
-        
-        order = {
-            'order_id': '12345',
-            'status': 'COMPLETE',
-            'tradingsymbol': 'RELIANCE'
-        }
-        
-        # Generate ID multiple times
-        id1 = system.generate_order_id(order)
-        id2 = system.generate_order_id(order)
-        
-        self.assertEqual(id1, id2)  # Should be consistent
-    
-    @patch('utils.automated_token_generator.KiteConnect')
-    def test_monitor_trades_success(self, mock_kite_connect):
+        order_id = system.generate_order_id(_SAMPLE_ORDER)
+
+        assert order_id == ('12345', 'COMPLETE', 'RELIANCE')
+        hash(order_id)  # usable as a processed_orders key
+
+    # generate_order_id is pure, so the module-scoped template is safe to share
+    # across examples (a function-scoped fixture would not be reset between them)
+    @settings(max_examples=50)
+    @given(order=_ORDERS, other=_ORDERS)
+    def test_generate_order_id_distinguishes_orders(self, _system_template, order, other):
+        """Test orders differing in order_id or status never share a key"""
+        assume((order['order_id'], order['status']) != (other['order_id'], other['status']))
+
+        assert (_system_template.generate_order_id(order) !=
+                _system_template.generate_order_id(other))
+
+    def test_generate_order_id_tracks_status(self, system):
+        """Test equal orders share a key and a status change gives a new one"""
+        key = system.generate_order_id(_SAMPLE_ORDER)
+
+        assert system.generate_order_id(dict(_SAMPLE_ORDER)) == key
+        assert system.generate_order_id({**_SAMPLE_ORDER, 'status': 'OPEN'}) != key
+
+    def test_monitor_trades_success(self, system, mock_kite, monkeypatch):
         """Test successful trade monitoring"""
-        # Mock KiteConnect instance
-        mock_kite = Mock()
-        mock_kite.orders.return_value = [
-            {
-                'order_id': '12345',
-                'status': 'COMPLETE',
-                'tradingsymbol': 'RELIANCE',
-                'transaction_type': 'BUY',
-                'quantity': 100,
-                'price': 2500.50
-            }
-        ]
-        mock_kite_connect.return_value = mock_kite
-        
-        system = AutomatedKiteSystem()
         system.kite = mock_kite
-        
+
         # Mock notification method
-        with patch.object(system, 'send_trade_notification', return_value=True):
-            system.monitor_trades()
-            
-            # Check if order was processed
-            self.assertEqual(len(system.processed_orders), 1)
-            mock_kite.orders.assert_called_once()
-    
-    @patch('utils.automated_token_generator.KiteConnect')
-    def test_monitor_trades_duplicate_prevention(self, mock_kite_connect):
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(return_value=True))
+        wait(system.monitor_trades())
+
+        # Check if order was processed
+        assert len(system.processed_orders) == 1
+        mock_kite.orders.assert_called_once()
+
+    def test_monitor_trades_duplicate_prevention(self, system, mock_kite, monkeypatch):
         """Test duplicate order prevention"""
-        # Mock KiteConnect instance
-        mock_kite = Mock()
-        mock_kite.orders.return_value = [
-            {
-                'order_id': '12345',
-                'status': 'COMPLETE',
-                'tradingsymbol': 'RELIANCE',
-                'transaction_type': 'BUY',
-                'quantity': 100,
-                'price': 2500.50
-            }
-        ]
-        mock_kite_connect.return_value = mock_kite
-        
-        system = AutomatedKiteSystem()
         system.kite = mock_kite
-        
+
         # Mock notification method
-        with patch.object(system, 'send_trade_notification', return_value=True):
-            # Process the same order twice
-            system.monitor_trades()
-            system.monitor_trades()
-            
-            # Should only process once
-            self.assertEqual(len(system.processed_orders), 1)
-    
-    @patch('utils.automated_token_generator.KiteConnect')
-    def test_monitor_trades_memory_cleanup(self, mock_kite_connect):
-        """Test memory cleanup for processed orders"""
-        # Mock KiteConnect instance
-        mock_kite = Mock()
-        mock_kite.orders.return_value = []
-        mock_kite_connect.return_value = mock_kite
-        
-        system = AutomatedKiteSystem()
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(return_value=True))
+
+        # Process the same order twice, before and after its send finished
+        first = system.monitor_trades()
+        wait(first + system.monitor_trades())
+        wait(system.monitor_trades())
+
+        # Should only process once
+        assert len(system.processed_orders) == 1
+
+    def test_monitor_trades_batches_notifications(self, system, kite_mock, monkeypatch):
+        """Test orders completed in the same tick share one notification"""
+        second = {**_SAMPLE_ORDER, 'order_id': '12346', 'transaction_type': 'SELL'}
+        kite_mock.orders.return_value = [dict(_SAMPLE_ORDER), second]
+        system.kite = kite_mock
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(return_value=True))
+
+        wait(system.monitor_trades())
+
+        assert system.send_trade_notification.call_count == 1
+        assert system.send_trade_notification.call_args.args[0].count('RELIANCE') == 2
+        assert len(system.processed_orders) == 2
+
+    def test_monitor_trades_splits_long_batches(self, system, kite_mock, monkeypatch):
+        """Test batches past Telegram's length limit go out as separate sends"""
+        kite_mock.orders.return_value = [{**_SAMPLE_ORDER, 'order_id': str(i)} for i in range(40)]
+        system.kite = kite_mock
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(return_value=True))
+
+        wait(system.monitor_trades())
+
+        sent = [call.args[0] for call in system.send_trade_notification.call_args_list]
+        assert len(sent) > 1
+        assert all(len(text) <= 4096 for text in sent)
+        assert sum(text.count('RELIANCE') for text in sent) == 40
+        assert len(system.processed_orders) == 40
+
+    def test_on_order_update(self, system, monkeypatch):
+        """Test order updates pushed by KiteTicker"""
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(return_value=True))
+
+        # The same update delivered twice notifies once
+        futures = system.on_order_update(None, dict(_SAMPLE_ORDER))
+        wait(futures + system.on_order_update(None, dict(_SAMPLE_ORDER)))
+
+        assert system.send_trade_notification.call_count == 1
+        assert len(system.processed_orders) == 1
+
+    def test_monitor_trades_retries_failed_notification(self, system, mock_kite, monkeypatch):
+        """Test an order whose notification failed is sent again by a later order book check"""
+        system.kite = mock_kite
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(side_effect=[False, True]))
+
+        wait(system.monitor_trades())
+        assert len(system.processed_orders) == 0
+
+        wait(system.monitor_trades())
+        assert len(system.processed_orders) == 1
+
+    def test_failed_notification_is_retried_on_a_timer(self, system, mock_kite, monkeypatch):
+        """Test a pushed order whose send failed is re-read from the order book and sent again"""
+        monkeypatch.setattr('utils.automated_token_generator.NOTIFY_RETRY_SECONDS', 0.01)
         system.kite = mock_kite
-        
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(side_effect=[False, True]))
+
+        wait(system.on_order_update(None, dict(_SAMPLE_ORDER)))
+
+        # The retry runs on the timer and the pool; give it a few seconds at most
+        deadline = time.monotonic() + 5
+        while not system.processed_orders and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(system.processed_orders) == 1
+        mock_kite.orders.assert_called_once()
+
+    def test_on_order_update_does_not_wait_for_send(self, system, monkeypatch):
+        """Test the ticker callback returns while the Telegram send is still running"""
+        release = threading.Event()
+        monkeypatch.setattr(system, 'send_trade_notification',
+                            Mock(side_effect=lambda text: release.wait(5)))
+
+        futures = system.on_order_update(None, dict(_SAMPLE_ORDER))
+        assert not any(future.done() for future in futures)
+
+        release.set()
+        wait(futures)
+        assert len(system.processed_orders) == 1
+
+    def test_on_connect_catches_up(self, system, mock_kite, monkeypatch):
+        """Test (re)connecting the ticker notifies orders completed while it was away"""
+        system.kite = mock_kite
+        monkeypatch.setattr(system, 'send_trade_notification', Mock(return_value=True))
+
+        wait(system.on_connect(None, {}).result())
+
+        mock_kite.orders.assert_called_once()
+        assert len(system.processed_orders) == 1
+
+    def test_postback_handler(self, system, monkeypatch):
+        """Test Kite postbacks are checksum-verified before they reach on_order_update"""
+        import hashlib
+        import threading
+        import urllib.error
+        import urllib.request
+        from http.server import ThreadingHTTPServer
+        from utils.automated_token_generator import make_postback_handler
+
+        monkeypatch.setattr(system, 'on_order_update', Mock())
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_postback_handler(system))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        def post(order):
+            request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/",
+                                             data=json.dumps(order).encode(), method='POST')
+            try:
+                return urllib.request.urlopen(request, timeout=5).status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        order = {**_SAMPLE_ORDER, 'order_timestamp': '2024-01-01 10:30:00'}
+        order['checksum'] = hashlib.sha256(
+            f"{order['order_id']}{order['order_timestamp']}{system.API_SECRET}".encode()).hexdigest()
+        try:
+            assert post({**order, 'checksum': 'forged'}) == 403
+            assert post(order) == 200
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        system.on_order_update.assert_called_once_with(None, order)
+
+    def test_monitor_trades_memory_cleanup(self, system, kite_mock):
+        """Test memory cleanup for processed orders"""
+        kite_mock.orders.return_value = []
+        system.kite = kite_mock
+
         # Add many processed orders
-        for i in range(60):
-            system.processed_orders.add(f"order_{i}")
-        
-        self.assertEqual(len(system.processed_orders), 60)
-        
+        system.processed_orders.update(dict.fromkeys(_SIXTY_ORDERS))
+
+        assert len(system.processed_orders) == 60
+
         # Monitor trades should trigger cleanup
         system.monitor_trades()
-        
-        # Should be cleaned up to 25 items
-        self.assertEqual(len(system.processed_orders), 25)
-    
-    def test_monitor_trades_no_kite_client(self):
+
+        # Should be trimmed to the 50 most recent orders
+        assert list(system.processed_orders) == list(_SIXTY_ORDERS[10:])
+
+    def test_monitor_trades_no_kite_client(self, system):
         """Test trade monitoring without Kite client"""
-        system = AutomatedKiteSystem()
         system.kite = None
-        
+
         # Should not raise exception
         system.monitor_trades()
-    
-    @patch('utils.automated_token_generator.KiteConnect')
-    def test_monitor_trades_api_error(self, mock_kite_connect):
+
+    def test_monitor_trades_api_error(self, system, mock_kite_err):
         """Test trade monitoring with API error"""
-        # Mock KiteConnect instance that raises exception
-        mock_kite = Mock()
-        mock_kite.orders.side_effect = Exception("API Error")
-        mock_kite_connect.return_value = mock_kite
-        
-        system = AutomatedKiteSystem()
-        system.kite = mock_kite
-        
+        system.kite = mock_kite_err
+
         # Should not raise exception
         system.monitor_trades()
-    
-    def test_trade_count_increment(self):
+
+    def test_trade_count_increment(self, system):
         """Test trade count increment"""
-        system = AutomatedKiteSystem()
-        
         # Initial count should be 0
-        self.assertEqual(system.trade_count, 0)
-        
+        assert system.trade_count == 0
+
         # Format a trade message (increments count)
-        order = {
-            'tradingsymbol': 'RELIANCE',
-            'transaction_type': 'BUY',
-            'quantity': 100,
-            'price': 2500.50
-        }
-        
-        system.format_trade_message(order)
-        self.assertEqual(system.trade_count, 1)
-        
-        system.format_trade_message(order)
-        self.assertEqual(system.trade_count, 2)
-
-class TestAutomatedTokenGeneration(unittest.TestCase):
+        system.format_trade_message(_SAMPLE_ORDER)
+        assert system.trade_count == 1
+
+        system.format_trade_message(_SAMPLE_ORDER)
+        assert system.trade_count == 2
+
+class TestAutomatedTokenGeneration:
     """Test cases for automated token generation functionality"""
-    
-    def setUp(self):
-        """Set up test environment"""
-        self.test_env = {
-            'AUTOMATED_USER_ID': 'test_user_id',
-            'AUTOMATED_PASSWORD': 'test_password',
-            'AUTOMATED_API_KEY': 'test_api_key',
-            'AUTOMATED_API_SECRET': 'test_api_secret',
-            'AUTOMATED_AUTH_SECRET': 'test_auth_secret',
-            'TELEGRAM_BOT_TOKEN': 'test_bot_token',
-            'TELEGRAM_CHAT_ID': 'test_chat_id'
-        }
-        
-        self.env_patcher = patch.dict(os.environ, self.test_env)
-        self.env_patcher.start()
-    
-    def tearDown(self):
-        """Clean up after tests"""
-        self.env_patcher.stop()
-    
-    @patch('utils.automated_token_generator.webdriver.Chrome')
-    @patch('utils.automated_token_generator.KiteConnect')
-    def test_automated_token_generation_success(self, mock_kite_connect, mock_chrome):
+
+    def test_automated_token_generation_success(self, system, kite_mock, login_session,
+                                                tmp_path, monkeypatch):
         """Test successful automated token generation"""
-        # Mock WebDriver
-        mock_driver = Mock()
-        mock_driver.current_url = "https://kite.zerodha.com/connect/login?request_token=test_token"
-        mock_chrome.return_value = mock_driver
-        
-        # Mock WebDriverWait and elements
-        with patch('utils.automated_token_generator.WebDriverWait') as mock_wait:
-            mock_element = Mock()
-            mock_wait.return_value.until.return_value = mock_element
-            
-            # Mock KiteConnect
-            mock_kite = Mock()
-            mock_kite.generate_session.return_value = {"access_token": "test_access_token"}
-            mock_kite_connect.return_value = mock_kite
-            
-            system = AutomatedKiteSystem()
-            result = system.automated_token_generation()
-            
-            self.assertEqual(result, "test_access_token")
-            mock_driver.get.assert_called_once()
-            mock_driver.quit.assert_called_once()
-    
-    @patch('utils.automated_token_generator.webdriver.Chrome')
-    def test_automated_token_generation_failure(self, mock_chrome):
+        # automated_config.json is written to the working directory
+        monkeypatch.chdir(tmp_path)
+
+        kite_mock.generate_session.return_value = {"access_token": "test_access_token"}
+
+        result = system.automated_token_generation()
+
+        assert result == "test_access_token"
+        twofa = login_session.post.call_args_list[1].kwargs['data']
+        assert twofa['request_id'] == 'test_request_id'
+        assert twofa['twofa_value'] == '123456'
+        assert login_session.get.call_args.kwargs['allow_redirects'] is False
+        kite_mock.generate_session.assert_called_once_with("test_token", api_secret=system.API_SECRET)
+
+    def test_automated_token_generation_failure(self, system, login_session):
         """Test failed automated token generation"""
-        # Mock WebDriver that raises exception
-        mock_chrome.side_effect = Exception("Chrome error")
-        
-        system = AutomatedKiteSystem()
+        # Login API that cannot be reached
+        login_session.post.side_effect = Exception("Login error")
+
         result = system.automated_token_generation()
-        
-        self.assertIsNone(result)
-    
-    @patch('utils.automated_token_generator.webdriver.Chrome')
-    def test_automated_token_generation_no_token(self, mock_chrome):
+
+        assert result is None
+
+    def test_automated_token_generation_no_token(self, system, login_session):
         """Test automated token generation with no request token"""
-        # Mock WebDriver
-        mock_driver = Mock()
-        mock_driver.current_url = "https://kite.zerodha.com/connect/login"  # No request_token
-        mock_chrome.return_value = mock_driver
-        
-        # Mock WebDriverWait and elements
-        with patch('utils.automated_token_generator.WebDriverWait') as mock_wait:
-            mock_element = Mock()
-            mock_wait.return_value.until.return_value = mock_element
-            
-            system = AutomatedKiteSystem()
-            result = system.automated_token_generation()
-            
-            self.assertIsNone(result)
-            mock_driver.quit.assert_called_once()
-
-class TestIntegration(unittest.TestCase):
+        login_session.get.return_value = _login_response()  # No redirect, no request_token
+
+        result = system.automated_token_generation()
+
+        assert result is None
+
+    def test_save_config_skips_unchanged(self, AutomatedKiteSystem, tmp_path):
+        """Test the config is written atomically and left alone when nothing changed"""
+        path = str(tmp_path / 'automated_config.json')
+        config = {'kite': {'api_key': 'k', 'access_token': 't'}, 'generated_at': '1'}
+
+        assert AutomatedKiteSystem._save_config(config, path) is True
+        assert AutomatedKiteSystem._save_config({**config, 'generated_at': '2'}, path) is False
+        assert json.loads((tmp_path / 'automated_config.json').read_text()) == config
+        assert (tmp_path / 'automated_config.json').read_text().startswith('{\n  "kite"')
+        assert [p.name for p in tmp_path.iterdir()] == ['automated_config.json']
+        assert (tmp_path / 'automated_config.json').stat().st_mode & 0o777 == 0o600
+
+        # A new access token is written
+        config['kite']['access_token'] = 't2'
+        assert AutomatedKiteSystem._save_config(config, path) is True
+
+    def test_save_config_failed_write_leaves_no_temp_file(self, AutomatedKiteSystem, tmp_path):
+        """Test a write that fails midway keeps the old config and removes its temp file"""
+        path = str(tmp_path / 'automated_config.json')
+        AutomatedKiteSystem._save_config({'kite': {'access_token': 't'}}, path)
+
+        with pytest.raises(TypeError):
+            AutomatedKiteSystem._save_config({'kite': {'access_token': object()}}, path)
+
+        assert [p.name for p in tmp_path.iterdir()] == ['automated_config.json']
+        assert json.loads((tmp_path / 'automated_config.json').read_text()) == {'kite': {'access_token': 't'}}
+
+class TestIntegration:
     """Integration tests for the automated system"""
-    
-    def setUp(self):
-        """Set up test environment"""
-        self.test_env = {
-            'AUTOMATED_USER_ID': 'test_user_id',
-            'AUTOMATED_PASSWORD': 'test_password',
-            'AUTOMATED_API_KEY': 'test_api_key',
-            'AUTOMATED_API_SECRET': 'test_api_secret',
-            'AUTOMATED_AUTH_SECRET': 'test_auth_secret',
-            'TELEGRAM_BOT_TOKEN': 'test_bot_token',
-            'TELEGRAM_CHAT_ID': 'test_chat_id'
-        }
-        
-        self.env_patcher = patch.dict(os.environ, self.test_env)
-        self.env_patcher.start()
-    
-    def tearDown(self):
-        """Clean up after tests"""
-        self.env_patcher.stop()
-    
-    @patch('utils.automated_token_generator.webdriver.Chrome')
-    @patch('utils.automated_token_generator.KiteConnect')
-    @patch('utils.automated_token_generator.requests.post')
-    def test_full_workflow_simulation(self, mock_post, mock_kite_connect, mock_chrome):
+
+    def test_full_workflow_simulation(self, system, mocks_bundle, tmp_path, monkeypatch):
         """Test complete workflow simulation"""
+        # automated_config.json is written to the working directory
+        monkeypatch.chdir(tmp_path)
+
         # Mock successful token generation
-        mock_driver = Mock()
-        mock_driver.current_url = "https://kite.zerodha.com/connect/login?request_token=test_token"
-        mock_chrome.return_value = mock_driver
-        
-        with patch('utils.automated_token_generator.WebDriverWait') as mock_wait:
-            mock_element = Mock()
-            mock_wait.return_value.until.return_value = mock_element
-            
-            # Mock KiteConnect
-            mock_kite = Mock()
-            mock_kite.generate_session.return_value = {"access_token": "test_access_token"}
-            mock_kite.orders.return_value = [
-                {
-                    'order_id': '12345',
-                    'status': 'COMPLETE',
-                    'tradingsymbol': 'RELIANCE',
-                    'transaction_type': 'BUY',
-                    'quantity': 100,
-                    'price': 2500.50
-                }
-            ]
-            mock_kite_connect.return_value = mock_kite
-            
-            # Mock Telegram notification
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_post.return_value = mock_response
-            
-            system = AutomatedKiteSystem()
-            
-            # Test token generation
-            token = system.automated_token_generation()
-            self.assertEqual(token, "test_access_token")
-            
-            # Test trade monitoring
-            system.kite = mock_kite
-            system.monitor_trades()
-            
-            # Verify notification was sent
-            self.assertEqual(mock_post.call_count, 1)
-            self.assertEqual(len(system.processed_orders), 1)
-
-if __name__ == '__main__':
-    # Run tests with verbose output
-    unittest.main(verbosity=2)
+        mocks_bundle.kite.generate_session.return_value = {"access_token": "test_access_token"}
+
+        # Test token generation
+        token = system.automated_token_generation()
+        assert token == "test_access_token"
+
+        # Test trade monitoring
+        system.kite = mocks_bundle.kite
+        wait(system.monitor_trades())
+
+        # Verify notification was sent
+        assert mocks_bundle.post.call_count == 1
+        assert len(system.processed_orders) == 1
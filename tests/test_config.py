@@ -14,66 +14,95 @@ Features:
 """
 
 import os
-import sys
+import copy
 import tempfile
 import json
+from types import MappingProxyType
 from unittest.mock import Mock, MagicMock
 
-# Add the project root to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Test environment variables, built once at import and shared read-only
+_TEST_ENV_VARS = MappingProxyType({
+    # Master account
+    'MASTER_API_KEY': 'test_master_api_key',
+    'MASTER_API_SECRET': 'test_master_api_secret',
+    'MASTER_ACCESS_TOKEN': 'test_master_access_token',
+    'MASTER_USER_ID': 'test_master_user_id',
+    
+    # Follower accounts
+    'FOLLOWER_COUNT': '2',
+    'FOLLOWER_1_API_KEY': 'test_follower1_api_key',
+    'FOLLOWER_1_API_SECRET': 'test_follower1_api_secret',
+    'FOLLOWER_1_ACCESS_TOKEN': 'test_follower1_access_token',
+    'FOLLOWER_1_USER_ID': 'test_follower1_user_id',
+    'FOLLOWER_1_MULTIPLIER': '0.5',
+    'FOLLOWER_1_MAX_POSITION': '500',
+    'FOLLOWER_1_ENABLED': 'True',
+    
+    'FOLLOWER_2_API_KEY': 'test_follower2_api_key',
+    'FOLLOWER_2_API_SECRET': 'test_follower2_api_secret',
+    'FOLLOWER_2_ACCESS_TOKEN': 'test_follower2_access_token',
+    'FOLLOWER_2_USER_ID': 'test_follower2_user_id',
+    'FOLLOWER_2_MULTIPLIER': '0.8',
+    'FOLLOWER_2_MAX_POSITION': '800',
+    'FOLLOWER_2_ENABLED': 'False',
+    
+    # Automated system
+    'AUTOMATED_USER_ID': 'test_automated_user_id',
+    'AUTOMATED_PASSWORD': 'test_automated_password',
+    'AUTOMATED_API_KEY': 'test_automated_api_key',
+    'AUTOMATED_API_SECRET': 'test_automated_api_secret',
+    'AUTOMATED_AUTH_SECRET': 'test_automated_auth_secret',
+    
+    # Notifications
+    'TELEGRAM_BOT_TOKEN': 'test_telegram_bot_token',
+    'TELEGRAM_CHAT_ID': 'test_telegram_chat_id',
+    'TWILIO_ACCOUNT_SID': 'test_twilio_account_sid',
+    'TWILIO_AUTH_TOKEN': 'test_twilio_auth_token',
+    'TWILIO_WHATSAPP_FROM': 'test_twilio_whatsapp_from',
+    'WHATSAPP_TO': 'test_whatsapp_to',
+    
+    # System settings
+    'PAPER_TRADING': 'True',
+    'LOG_LEVEL': 'INFO',
+    'CHECK_INTERVAL': '1',
+    'MAX_RETRIES': '3',
+    'MAX_DAILY_TRADES': '100',
+    'RISK_MANAGEMENT': 'True'
+})
+
+def _build_sample_config():
+    """Two-follower config file contents derived from the test environment"""
+    return {
+        "followers": [
+            {
+                "api_key": _TEST_ENV_VARS[f'FOLLOWER_{i}_API_KEY'],
+                "api_secret": _TEST_ENV_VARS[f'FOLLOWER_{i}_API_SECRET'],
+                "access_token": _TEST_ENV_VARS[f'FOLLOWER_{i}_ACCESS_TOKEN'],
+                "user_id": _TEST_ENV_VARS[f'FOLLOWER_{i}_USER_ID'],
+                "multiplier": float(_TEST_ENV_VARS[f'FOLLOWER_{i}_MULTIPLIER']),
+                "max_position_size": int(_TEST_ENV_VARS[f'FOLLOWER_{i}_MAX_POSITION']),
+                "enabled": _TEST_ENV_VARS[f'FOLLOWER_{i}_ENABLED'].lower() == 'true'
+            }
+            for i in (1, 2)
+        ]
+    }
+
+# Attributes the mocks below expose; anything else raises AttributeError
+_KITE_MOCK_SPEC = ('profile', 'orders', 'positions', 'generate_session')
 
 class TestConfig:
-    """Configuration class for tests"""
+    """Configuration class for tests
+
+    Mock convention: give mocks a spec with ``Mock(spec=SomeClass)`` when
+    only attribute names matter, or ``MagicMock(spec_set=[...])`` when the
+    handful of attributes a test touches is known up front. Use
+    ``create_autospec(SomeClass, instance=True)`` only when call signatures
+    are asserted; instance=True skips introspecting the class a second time
+    for its constructor.
+    """
     
     # Test environment variables
-    TEST_ENV_VARS = {
-        # Master account
-        'MASTER_API_KEY': 'test_master_api_key',
-        'MASTER_API_SECRET': 'test_master_api_secret',
-        'MASTER_ACCESS_TOKEN': 'test_master_access_token',
-        'MASTER_USER_ID': 'test_master_user_id',
-        
-        # Follower accounts
-        'FOLLOWER_COUNT': '2',
-        'FOLLOWER_1_API_KEY': 'test_follower1_api_key',
-        'FOLLOWER_1_API_SECRET': 'test_follower1_api_secret',
-        'FOLLOWER_1_ACCESS_TOKEN': 'test_follower1_access_token',
-        'FOLLOWER_1_USER_ID': 'test_follower1_user_id',
-        'FOLLOWER_1_MULTIPLIER': '0.5',
-        'FOLLOWER_1_MAX_POSITION': '500',
-        'FOLLOWER_1_ENABLED': 'True',
-        
-        'FOLLOWER_2_API_KEY': 'test_follower2_api_key',
-        'FOLLOWER_2_API_SECRET': 'test_follower2_api_secret',
-        'FOLLOWER_2_ACCESS_TOKEN': 'test_follower2_access_token',
-        'FOLLOWER_2_USER_ID': 'test_follower2_user_id',
-        'FOLLOWER_2_MULTIPLIER': '0.8',
-        'FOLLOWER_2_MAX_POSITION': '800',
-        'FOLLOWER_2_ENABLED': 'False',
-        
-        # Automated system
-        'AUTOMATED_USER_ID': 'test_automated_user_id',
-        'AUTOMATED_PASSWORD': 'test_automated_password',
-        'AUTOMATED_API_KEY': 'test_automated_api_key',
-        'AUTOMATED_API_SECRET': 'test_automated_api_secret',
-        'AUTOMATED_AUTH_SECRET': 'test_automated_auth_secret',
-        
-        # Notifications
-        'TELEGRAM_BOT_TOKEN': 'test_telegram_bot_token',
-        'TELEGRAM_CHAT_ID': 'test_telegram_chat_id',
-        'TWILIO_ACCOUNT_SID': 'test_twilio_account_sid',
-        'TWILIO_AUTH_TOKEN': 'test_twilio_auth_token',
-        'TWILIO_WHATSAPP_FROM': 'test_twilio_whatsapp_from',
-        'WHATSAPP_TO': 'test_whatsapp_to',
-        
-        # System settings
-        'PAPER_TRADING': 'True',
-        'LOG_LEVEL': 'INFO',
-        'CHECK_INTERVAL': '1',
-        'MAX_RETRIES': '3',
-        'MAX_DAILY_TRADES': '100',
-        'RISK_MANAGEMENT': 'True'
-    }
+    TEST_ENV_VARS = _TEST_ENV_VARS
     
     # Mock data for testing
     MOCK_TRADE_DATA = {
@@ -129,107 +158,82 @@ class TestConfig:
     TEST_LOG_FILE = 'test_copy_trader.log'
     TEST_ENV_FILE = 'test.env'
     
+    # Serialized create_test_config_file contents; the inputs are static
+    _SAMPLE_BYTES = json.dumps(_build_sample_config(), indent=2).encode()
+    
+    # Attribute specs for the mock factories, built on first use
+    _KITE_MOCK_ATTRS = None
+    
     @classmethod
     def setup_test_environment(cls):
         """Set up test environment with mock data"""
-        # Set environment variables
-        for key, value in cls.TEST_ENV_VARS.items():
-            os.environ[key] = value
+        # Remember what the variables were so cleanup can restore them
+        if not hasattr(cls, '_saved_env'):
+            cls._saved_env = {key: os.environ.get(key) for key in _TEST_ENV_VARS}
         
-        # Create temporary directory for test files
-        cls.test_dir = tempfile.mkdtemp()
-        cls.original_cwd = os.getcwd()
-        os.chdir(cls.test_dir)
+        # Set environment variables
+        os.environ.update(_TEST_ENV_VARS)
+    
+    @classmethod
+    def get_disk_dir(cls):
+        """Create (on first use) a temporary directory for test files"""
+        # Create the temporary directory once and reuse it until cleanup.
+        # The working directory is left alone; callers join paths onto it.
+        if not os.path.isdir(getattr(cls, 'test_dir', '')):
+            cls.test_dir = tempfile.mkdtemp(prefix='kct-', dir=os.environ.get('TMPDIR'))
         
         return cls.test_dir
     
     @classmethod
     def cleanup_test_environment(cls):
         """Clean up test environment"""
-        # Restore original working directory
-        if hasattr(cls, 'original_cwd'):
-            os.chdir(cls.original_cwd)
+        # Restore the environment variables saved by setup_test_environment
+        if hasattr(cls, '_saved_env'):
+            for key, value in cls._saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            del cls._saved_env
         
         # Clean up test directory
         if hasattr(cls, 'test_dir'):
             import shutil
             shutil.rmtree(cls.test_dir, ignore_errors=True)
+            del cls.test_dir
     
     @classmethod
     def create_test_config_file(cls, filename=None):
-        """Create a test configuration file"""
+        """Create a test configuration file in the test directory"""
         if filename is None:
             filename = cls.TEST_CONFIG_FILE
+        path = os.path.join(cls.get_disk_dir(), filename)
         
-        config_data = {
-            "followers": [
-                {
-                    "api_key": cls.TEST_ENV_VARS['FOLLOWER_1_API_KEY'],
-                    "api_secret": cls.TEST_ENV_VARS['FOLLOWER_1_API_SECRET'],
-                    "access_token": cls.TEST_ENV_VARS['FOLLOWER_1_ACCESS_TOKEN'],
-                    "user_id": cls.TEST_ENV_VARS['FOLLOWER_1_USER_ID'],
-                    "multiplier": float(cls.TEST_ENV_VARS['FOLLOWER_1_MULTIPLIER']),
-                    "max_position_size": int(cls.TEST_ENV_VARS['FOLLOWER_1_MAX_POSITION']),
-                    "enabled": cls.TEST_ENV_VARS['FOLLOWER_1_ENABLED'].lower() == 'true'
-                },
-                {
-                    "api_key": cls.TEST_ENV_VARS['FOLLOWER_2_API_KEY'],
-                    "api_secret": cls.TEST_ENV_VARS['FOLLOWER_2_API_SECRET'],
-                    "access_token": cls.TEST_ENV_VARS['FOLLOWER_2_ACCESS_TOKEN'],
-                    "user_id": cls.TEST_ENV_VARS['FOLLOWER_2_USER_ID'],
-                    "multiplier": float(cls.TEST_ENV_VARS['FOLLOWER_2_MULTIPLIER']),
-                    "max_position_size": int(cls.TEST_ENV_VARS['FOLLOWER_2_MAX_POSITION']),
-                    "enabled": cls.TEST_ENV_VARS['FOLLOWER_2_ENABLED'].lower() == 'true'
-                }
-            ]
-        }
-        
-        with open(filename, 'w') as f:
-            json.dump(config_data, f, indent=2)
+        with open(path, 'wb') as f:
+            f.write(cls._SAMPLE_BYTES)
         
-        return filename
+        return path
     
     @classmethod
     def create_mock_kite_client(cls):
         """Create a mock KiteConnect client"""
-        mock_kite = Mock()
-        
-        # Mock profile method
-        mock_kite.profile.return_value = cls.MOCK_PROFILE_DATA
-        
-        # Mock orders method
-        mock_kite.orders.return_value = [cls.MOCK_TRADE_DATA, cls.MOCK_ORDER_DATA]
-        
-        # Mock positions method
-        mock_kite.positions.return_value = {
-            'day': [cls.MOCK_POSITION_DATA],
-            'net': []
-        }
-        
-        # Mock generate_session method
-        mock_kite.generate_session.return_value = {
-            'access_token': 'test_access_token',
-            'refresh_token': 'test_refresh_token'
-        }
-        
-        return mock_kite
-    
-    @classmethod
-    def create_mock_webdriver(cls):
-        """Create a mock WebDriver for automated tests"""
-        mock_driver = Mock()
-        
-        # Mock WebDriver methods
-        mock_driver.get.return_value = None
-        mock_driver.current_url = "https://kite.zerodha.com/connect/login?request_token=test_token"
-        mock_driver.quit.return_value = None
-        
-        # Mock WebDriverWait
-        mock_element = Mock()
-        mock_element.send_keys.return_value = None
-        mock_element.clear.return_value = None
+        if cls._KITE_MOCK_ATTRS is None:
+            cls._KITE_MOCK_ATTRS = {
+                'profile.return_value': cls.MOCK_PROFILE_DATA,
+                'orders.return_value': [cls.MOCK_TRADE_DATA, cls.MOCK_ORDER_DATA],
+                'positions.return_value': {
+                    'day': [cls.MOCK_POSITION_DATA],
+                    'net': []
+                },
+                'generate_session.return_value': {
+                    'access_token': 'test_access_token',
+                    'refresh_token': 'test_refresh_token'
+                }
+            }
         
-        return mock_driver, mock_element
+        # A copy.copy() of a cached Mock would share its child mocks and their
+        # call records, so build each client fresh and copy only the payloads
+        return MagicMock(spec_set=_KITE_MOCK_SPEC, **copy.deepcopy(cls._KITE_MOCK_ATTRS))
     
     @classmethod
     def create_mock_requests_response(cls, status_code=200, content=None):
@@ -289,26 +293,32 @@ class TestHelpers:
         }
 
 # Test data generators
+_TRADE_SYMBOLS = ('RELIANCE', 'TCS', 'INFY', 'HDFC', 'ICICIBANK')
+
 class TestDataGenerator:
     """Generate test data for various scenarios"""
     
+    @staticmethod
+    def iter_trade_sequence(count=5):
+        """Yield test trades one at a time (for load tests with very large counts)"""
+        base = TestConfig.MOCK_TRADE_DATA  # read-only
+        return (
+            {
+                **base,
+                'order_id': f'TEST_{i+1:03d}',
+                'tradingsymbol': _TRADE_SYMBOLS[i % len(_TRADE_SYMBOLS)],
+                'transaction_type': 'BUY' if i & 1 == 0 else 'SELL',
+                'quantity': (i + 1) * 10,
+                'price': 1000 + (i * 100),
+                'timestamp': f'2024-01-01 {10 + i}:30:00'
+            }
+            for i in range(count)
+        )
+    
     @staticmethod
     def generate_trade_sequence(count=5):
         """Generate a sequence of test trades"""
-        trades = []
-        symbols = ['RELIANCE', 'TCS', 'INFY', 'HDFC', 'ICICIBANK']
-        
-        for i in range(count):
-            trade = TestConfig.MOCK_TRADE_DATA.copy()
-            trade['order_id'] = f'TEST_{i+1:03d}'
-            trade['tradingsymbol'] = symbols[i % len(symbols)]
-            trade['transaction_type'] = 'BUY' if i % 2 == 0 else 'SELL'
-            trade['quantity'] = (i + 1) * 10
-            trade['price'] = 1000 + (i * 100)
-            trade['timestamp'] = f'2024-01-01 {10 + i}:30:00'
-            trades.append(trade)
-        
-        return trades
+        return list(TestDataGenerator.iter_trade_sequence(count))
     
     @staticmethod
     def generate_follower_configs(count=3):
@@ -340,7 +350,8 @@ if __name__ == '__main__':
     print("Testing configuration setup...")
     
     # Setup test environment
-    test_dir = TestConfig.setup_test_environment()
+    TestConfig.setup_test_environment()
+    test_dir = TestConfig.get_disk_dir()
     print(f"Test directory created: {test_dir}")
     
     # Create test config file
@@ -13,21 +13,38 @@ Test Coverage:
 - System integration
 """
 
-import unittest
-import os
-import sys
 import json
-import tempfile
-from unittest.mock import Mock, patch, MagicMock
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from datetime import datetime
 
-# Add the project root to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from core.config import SecureConfigManager, AccountConfig
-from core.notifications import NotificationManager, NotificationConfig
 
-class TestAccountConfig(unittest.TestCase):
+# Master and two followers, as SecureConfigManager reads them from the environment
+_ACCOUNT_ENV = {
+    'MASTER_API_KEY': 'master_key',
+    'MASTER_API_SECRET': 'master_secret',
+    'MASTER_ACCESS_TOKEN': 'master_token',
+    'MASTER_USER_ID': 'master_user',
+    'FOLLOWER_COUNT': '2',
+    'FOLLOWER_1_API_KEY': 'follower1_key',
+    'FOLLOWER_1_API_SECRET': 'follower1_secret',
+    'FOLLOWER_1_ACCESS_TOKEN': 'follower1_token',
+    'FOLLOWER_1_USER_ID': 'follower1_user',
+    'FOLLOWER_1_MULTIPLIER': '0.5',
+    'FOLLOWER_1_MAX_POSITION': '500',
+    'FOLLOWER_1_ENABLED': 'True',
+    'FOLLOWER_2_API_KEY': 'follower2_key',
+    'FOLLOWER_2_API_SECRET': 'follower2_secret',
+    'FOLLOWER_2_ACCESS_TOKEN': 'follower2_token',
+    'FOLLOWER_2_USER_ID': 'follower2_user',
+    'FOLLOWER_2_MULTIPLIER': '0.8',
+    'FOLLOWER_2_MAX_POSITION': '800',
+    'FOLLOWER_2_ENABLED': 'False'
+}
+
+class TestAccountConfig:
     """Test cases for AccountConfig class"""
     
     def test_account_config_initialization(self):
@@ -39,13 +56,13 @@ class TestAccountConfig(unittest.TestCase):
             user_id="test_user"
         )
         
-        self.assertEqual(config.api_key, "test_key")
-        self.assertEqual(config.api_secret, "test_secret")
-        self.assertEqual(config.access_token, "test_token")
-        self.assertEqual(config.user_id, "test_user")
-        self.assertEqual(config.multiplier, 1.0)
-        self.assertEqual(config.max_position_size, 1000)
-        self.assertTrue(config.enabled)
+        assert config.api_key == "test_key"
+        assert config.api_secret == "test_secret"
+        assert config.access_token == "test_token"
+        assert config.user_id == "test_user"
+        assert config.multiplier == 1.0
+        assert config.max_position_size == 1000
+        assert config.enabled
     
     def test_account_config_with_custom_values(self):
         """Test AccountConfig initialization with custom values"""
@@ -59,9 +76,9 @@ class TestAccountConfig(unittest.TestCase):
             enabled=False
         )
         
-        self.assertEqual(config.multiplier, 0.5)
-        self.assertEqual(config.max_position_size, 500)
-        self.assertFalse(config.enabled)
+        assert config.multiplier == 0.5
+        assert config.max_position_size == 500
+        assert not config.enabled
     
     def test_account_config_default_segments(self):
         """Test AccountConfig default segment configuration"""
@@ -73,104 +90,85 @@ class TestAccountConfig(unittest.TestCase):
         )
         
         expected_segments = ['NSE', 'BSE', 'NFO', 'MCX', 'BFO', 'CDS']
-        self.assertEqual(config.enabled_segments, expected_segments)
+        assert config.enabled_segments == expected_segments
         
         # Check segment multipliers
         for segment in expected_segments:
-            self.assertEqual(config.segment_multipliers[segment], 1.0)
+            assert config.segment_multipliers[segment] == 1.0
         
         # Check segment limits
-        self.assertEqual(config.segment_limits['NSE'], 1000)
-        self.assertEqual(config.segment_limits['NFO'], 500)  # Half of max_position_size
-        self.assertEqual(config.segment_limits['MCX'], 200)  # One-fifth of max_position_size
+        assert config.segment_limits['NSE'] == 1000
+        assert config.segment_limits['NFO'] == 500  # Half of max_position_size
+        assert config.segment_limits['MCX'] == 200  # One-fifth of max_position_size
+
+@pytest.fixture(scope="class")
+def account_env():
+    """Install the master/follower account environment once per class"""
+    # monkeypatch itself is function-scoped, so open a class-long context
+    with pytest.MonkeyPatch.context() as mp:
+        for key, value in _ACCOUNT_ENV.items():
+            mp.setenv(key, value)
+        yield _ACCOUNT_ENV
 
-class TestSecureConfigManager(unittest.TestCase):
+@pytest.mark.usefixtures("account_env")
+class TestSecureConfigManager:
     """Test cases for SecureConfigManager class"""
     
-    def setUp(self):
-        """Set up test environment"""
-        self.test_env = {
-            'MASTER_API_KEY': 'master_key',
-            'MASTER_API_SECRET': 'master_secret',
-            'MASTER_ACCESS_TOKEN': 'master_token',
-            'MASTER_USER_ID': 'master_user',
-            'FOLLOWER_COUNT': '2',
-            'FOLLOWER_1_API_KEY': 'follower1_key',
-            'FOLLOWER_1_API_SECRET': 'follower1_secret',
-            'FOLLOWER_1_ACCESS_TOKEN': 'follower1_token',
-            'FOLLOWER_1_USER_ID': 'follower1_user',
-            'FOLLOWER_1_MULTIPLIER': '0.5',
-            'FOLLOWER_1_MAX_POSITION': '500',
-            'FOLLOWER_1_ENABLED': 'True',
-            'FOLLOWER_2_API_KEY': 'follower2_key',
-            'FOLLOWER_2_API_SECRET': 'follower2_secret',
-            'FOLLOWER_2_ACCESS_TOKEN': 'follower2_token',
-            'FOLLOWER_2_USER_ID': 'follower2_user',
-            'FOLLOWER_2_MULTIPLIER': '0.8',
-            'FOLLOWER_2_MAX_POSITION': '800',
-            'FOLLOWER_2_ENABLED': 'False'
-        }
-        
-        self.env_patcher = patch.dict(os.environ, self.test_env)
-        self.env_patcher.start()
-    
-    def tearDown(self):
-        """Clean up after tests"""
-        self.env_patcher.stop()
-    
     def test_load_master_config(self):
         """Test loading master account configuration"""
         config_manager = SecureConfigManager()
         master_config = config_manager.load_master_config()
         
-        self.assertEqual(master_config.api_key, 'master_key')
-        self.assertEqual(master_config.api_secret, 'master_secret')
-        self.assertEqual(master_config.access_token, 'master_token')
-        self.assertEqual(master_config.user_id, 'master_user')
-        self.assertEqual(master_config.multiplier, 1.0)
+        assert master_config.api_key == 'master_key'
+        assert master_config.api_secret == 'master_secret'
+        assert master_config.access_token == 'master_token'
+        assert master_config.user_id == 'master_user'
+        assert master_config.multiplier == 1.0
     
     def test_load_follower_configs(self):
         """Test loading follower account configurations"""
         config_manager = SecureConfigManager()
         follower_configs = config_manager.load_follower_configs()
         
-        self.assertEqual(len(follower_configs), 2)
+        assert len(follower_configs) == 2
         
         # Check first follower
         follower1 = follower_configs[0]
-        self.assertEqual(follower1.api_key, 'follower1_key')
-        self.assertEqual(follower1.user_id, 'follower1_user')
-        self.assertEqual(follower1.multiplier, 0.5)
-        self.assertEqual(follower1.max_position_size, 500)
-        self.assertTrue(follower1.enabled)
+        assert follower1.api_key == 'follower1_key'
+        assert follower1.user_id == 'follower1_user'
+        assert follower1.multiplier == 0.5
+        assert follower1.max_position_size == 500
+        assert follower1.enabled
         
         # Check second follower
         follower2 = follower_configs[1]
-        self.assertEqual(follower2.api_key, 'follower2_key')
-        self.assertEqual(follower2.user_id, 'follower2_user')
-        self.assertEqual(follower2.multiplier, 0.8)
-        self.assertEqual(follower2.max_position_size, 800)
-        self.assertFalse(follower2.enabled)
+        assert follower2.api_key == 'follower2_key'
+        assert follower2.user_id == 'follower2_user'
+        assert follower2.multiplier == 0.8
+        assert follower2.max_position_size == 800
+        assert not follower2.enabled
     
-    def test_load_follower_configs_with_segment_settings(self):
+    def test_load_follower_configs_with_segment_settings(self, monkeypatch):
         """Test loading follower configs with segment-specific settings"""
-        test_env = self.test_env.copy()
-        test_env.update({
+        # Layer the segment settings on top of the class-level environment
+        segment_env = {
             'FOLLOWER_1_NSE_MULTIPLIER': '0.3',
             'FOLLOWER_1_NFO_MULTIPLIER': '0.1',
             'FOLLOWER_1_MCX_LIMIT': '100',
             'FOLLOWER_1_ENABLED_SEGMENTS': 'NSE,NFO'
-        })
-        
-        with patch.dict(os.environ, test_env):
-            config_manager = SecureConfigManager()
-            follower_configs = config_manager.load_follower_configs()
-            
-            follower1 = follower_configs[0]
-            self.assertEqual(follower1.segment_multipliers['NSE'], 0.3)
-            self.assertEqual(follower1.segment_multipliers['NFO'], 0.1)
-            self.assertEqual(follower1.segment_limits['MCX'], 100)
-            self.assertEqual(follower1.enabled_segments, ['NSE', 'NFO'])
+        }
+        
+        for key, value in segment_env.items():
+            monkeypatch.setenv(key, value)
+        
+        config_manager = SecureConfigManager()
+        follower_configs = config_manager.load_follower_configs()
+        
+        follower1 = follower_configs[0]
+        assert follower1.segment_multipliers['NSE'] == 0.3
+        assert follower1.segment_multipliers['NFO'] == 0.1
+        assert follower1.segment_limits['MCX'] == 100
+        assert follower1.enabled_segments == ['NSE', 'NFO']
     
     def test_validate_account_config(self):
         """Test account configuration validation"""
@@ -183,7 +181,7 @@ class TestSecureConfigManager(unittest.TestCase):
             access_token="test_token",
             user_id="test_user"
         )
-        self.assertTrue(config_manager._validate_account_config(valid_config))
+        assert config_manager._validate_account_config(valid_config)
         
         # Invalid config (empty fields)
         invalid_config = AccountConfig(
@@ -192,104 +190,128 @@ class TestSecureConfigManager(unittest.TestCase):
             access_token="test_token",
             user_id="test_user"
         )
-        self.assertFalse(config_manager._validate_account_config(invalid_config))
+        assert not config_manager._validate_account_config(invalid_config)
     
     def test_get_system_config(self):
         """Test system configuration retrieval"""
         config_manager = SecureConfigManager()
         system_config = config_manager.get_system_config()
         
-        self.assertIn('check_interval', system_config)
-        self.assertIn('max_retries', system_config)
-        self.assertIn('log_level', system_config)
-        self.assertIn('paper_trading', system_config)
-        self.assertIn('max_daily_trades', system_config)
-        self.assertIn('risk_management_enabled', system_config)
+        assert 'check_interval' in system_config
+        assert 'max_retries' in system_config
+        assert 'log_level' in system_config
+        assert 'paper_trading' in system_config
+        assert 'max_daily_trades' in system_config
+        assert 'risk_management_enabled' in system_config
     
-    def test_create_sample_config_file(self):
+    def test_create_sample_config_file(self, tmp_path, monkeypatch):
         """Test sample configuration file creation"""
         config_manager = SecureConfigManager()
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            original_cwd = os.getcwd()
-            os.chdir(temp_dir)
-            
-            try:
-                config_manager.create_sample_config_file()
-                
-                # Check if file was created
-                self.assertTrue(os.path.exists('config.json.sample'))
-                
-                # Check file content
-                with open('config.json.sample', 'r') as f:
-                    config_data = json.load(f)
-                
-                self.assertIn('followers', config_data)
-                self.assertIsInstance(config_data['followers'], list)
-                self.assertEqual(len(config_data['followers']), 1)
-                
-            finally:
-                os.chdir(original_cwd)
+        # The sample is written to the working directory
+        monkeypatch.chdir(tmp_path)
+        config_manager.create_sample_config_file()
+        
+        # Check the file that was created
+        config_data = json.loads((tmp_path / 'config.json.sample').read_text())
+        
+        # Check file content
+        assert 'followers' in config_data
+        assert isinstance(config_data['followers'], list)
+        assert len(config_data['followers']) == 1
+
+@pytest.fixture(scope="session")
+def NotificationConfig():
+    """Imported on first use so collection does not pay for core.notifications"""
+    from core.notifications import NotificationConfig as _NotificationConfig
+    return _NotificationConfig
 
-class TestNotificationConfig(unittest.TestCase):
+@pytest.fixture(scope="session")
+def NotificationManager():
+    """Imported on first use so collection does not pay for core.notifications"""
+    from core.notifications import NotificationManager as _NotificationManager
+    return _NotificationManager
+
+class TestNotificationConfig:
     """Test cases for NotificationConfig class"""
     
-    def test_notification_config_defaults(self):
+    def test_notification_config_defaults(self, NotificationConfig):
         """Test NotificationConfig default values"""
         config = NotificationConfig()
         
-        self.assertFalse(config.whatsapp_enabled)
-        self.assertFalse(config.telegram_enabled)
-        self.assertFalse(config.email_enabled)
-        self.assertFalse(config.discord_enabled)
-        self.assertEqual(config.smtp_port, 587)
+        assert not config.whatsapp_enabled
+        assert not config.telegram_enabled
+        assert not config.email_enabled
+        assert not config.discord_enabled
+        assert config.smtp_port == 587
 
-class TestNotificationManager(unittest.TestCase):
+class TestNotificationManager:
     """Test cases for NotificationManager class"""
     
-    def setUp(self):
-        """Set up test environment"""
-        self.test_config = NotificationConfig(
+    @pytest.fixture
+    def telegram_config(self, NotificationConfig):
+        """Telegram-enabled notification config"""
+        return NotificationConfig(
             telegram_enabled=True,
             telegram_bot_token="test_bot_token",
             telegram_chat_id="test_chat_id"
         )
     
-    @patch('core.notifications.requests.post')
-    def test_send_telegram_notification_success(self, mock_post):
+    @staticmethod
+    def _telegram_session(status):
+        """aiohttp-like session whose post() answers with the given status"""
+        response = MagicMock()
+        response.__aenter__ = AsyncMock(return_value=Mock(status=status))
+        response.__aexit__ = AsyncMock(return_value=False)
+        return Mock(post=Mock(return_value=response))
+    
+    @staticmethod
+    def _dispatch(manager, send, *args):
+        """Call a send_* method inside an event loop and return the mocked _send_telegram
+        
+        Telegram sends are scheduled with asyncio.create_task, so they need a
+        running loop and one turn of it to be awaited.
+        """
+        async def run():
+            with patch.object(manager, '_send_telegram', new_callable=AsyncMock) as mock_send:
+                send(*args)
+                await asyncio.sleep(0)
+            return mock_send
+        return asyncio.run(run())
+    
+    def test_send_telegram_success(self, NotificationManager, telegram_config, caplog):
         """Test successful Telegram notification"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_post.return_value = mock_response
+        manager = NotificationManager(telegram_config)
+        manager.session = self._telegram_session(200)
         
-        manager = NotificationManager(self.test_config)
-        result = manager.send_telegram_notification("Test message")
+        with caplog.at_level('INFO', logger='core.notifications'):
+            asyncio.run(manager._send_telegram("Test message"))
         
-        self.assertTrue(result)
-        mock_post.assert_called_once()
+        manager.session.post.assert_called_once_with(
+            "https://api.telegram.org/bottest_bot_token/sendMessage",
+            json={'chat_id': 'test_chat_id', 'text': 'Test message', 'parse_mode': 'Markdown'}
+        )
+        assert "Telegram message sent successfully" in caplog.text
     
-    @patch('core.notifications.requests.post')
-    def test_send_telegram_notification_failure(self, mock_post):
+    def test_send_telegram_failure(self, NotificationManager, telegram_config, caplog):
         """Test failed Telegram notification"""
-        mock_response = Mock()
-        mock_response.status_code = 400
-        mock_post.return_value = mock_response
+        manager = NotificationManager(telegram_config)
+        manager.session = self._telegram_session(400)
         
-        manager = NotificationManager(self.test_config)
-        result = manager.send_telegram_notification("Test message")
+        asyncio.run(manager._send_telegram("Test message"))
         
-        self.assertFalse(result)
+        assert "Telegram API error: 400" in caplog.text
     
-    def test_send_telegram_notification_disabled(self):
+    def test_send_telegram_disabled(self, NotificationConfig, NotificationManager):
         """Test Telegram notification when disabled"""
-        config = NotificationConfig(telegram_enabled=False)
-        manager = NotificationManager(config)
-        result = manager.send_telegram_notification("Test message")
+        manager = NotificationManager(NotificationConfig(telegram_enabled=False))
+        
+        mock_send = self._dispatch(manager, manager.send_daily_summary, {})
         
-        self.assertFalse(result)
+        mock_send.assert_not_called()
     
-    @patch('core.notifications.smtplib.SMTP')
-    def test_send_email_notification_success(self, mock_smtp):
+    @patch('smtplib.SMTP')
+    def test_send_email_success(self, mock_smtp, NotificationConfig, NotificationManager):
         """Test successful email notification"""
         config = NotificationConfig(
             email_enabled=True,
@@ -301,22 +323,26 @@ class TestNotificationManager(unittest.TestCase):
         )
         
         manager = NotificationManager(config)
-        result = manager.send_email_notification("Test subject", "Test message")
+        manager._send_email("Test subject", "Test message")
         
-        self.assertTrue(result)
-        mock_smtp.assert_called_once()
+        mock_smtp.assert_called_once_with("smtp.gmail.com", 587)
+        server = mock_smtp.return_value
+        server.login.assert_called_once_with("test@gmail.com", "test_password")
+        assert server.sendmail.call_count == 1
+        assert server.sendmail.call_args.args[:2] == ("test@gmail.com", "recipient@gmail.com")
     
-    def test_send_email_notification_disabled(self):
+    def test_send_email_disabled(self, NotificationConfig, NotificationManager):
         """Test email notification when disabled"""
-        config = NotificationConfig(email_enabled=False)
-        manager = NotificationManager(config)
-        result = manager.send_email_notification("Test subject", "Test message")
+        manager = NotificationManager(NotificationConfig(email_enabled=False))
+        
+        with patch.object(manager, '_send_email') as mock_send:
+            manager.send_system_alert("Test Alert", "Test message", "ERROR")
         
-        self.assertFalse(result)
+        mock_send.assert_not_called()
     
-    def test_send_trade_notification(self):
+    def test_send_trade_notification(self, NotificationManager, telegram_config):
         """Test trade notification formatting and sending"""
-        manager = NotificationManager(self.test_config)
+        manager = NotificationManager(telegram_config)
         
         trade_data = {
             'tradingsymbol': 'RELIANCE',
@@ -334,37 +360,37 @@ class TestNotificationManager(unittest.TestCase):
             }
         ]
         
-        with patch.object(manager, 'send_telegram_notification', return_value=True) as mock_send:
-            result = manager.send_trade_notification(trade_data, follower_results)
-            
-            self.assertTrue(result)
-            mock_send.assert_called_once()
-            
-            # Check if message contains trade details
-            call_args = mock_send.call_args[0][0]
-            self.assertIn('RELIANCE', call_args)
-            self.assertIn('BUY', call_args)
-            self.assertIn('100', call_args)
+        mock_send = self._dispatch(manager, manager.send_trade_notification, trade_data, follower_results)
+        
+        assert mock_send.await_count == 1
+        
+        # Check if message contains trade details
+        call_args = mock_send.call_args.args[0]
+        assert 'RELIANCE' in call_args
+        assert 'BUY' in call_args
+        assert '100' in call_args
     
-    def test_send_system_alert(self):
+    def test_send_system_alert(self, NotificationManager, telegram_config):
         """Test system alert notification"""
-        manager = NotificationManager(self.test_config)
-        
-        with patch.object(manager, 'send_telegram_notification', return_value=True) as mock_send:
-            result = manager.send_system_alert("Test Alert", "Test message", "INFO")
-            
-            self.assertTrue(result)
-            mock_send.assert_called_once()
-            
-            # Check if message contains alert details
-            call_args = mock_send.call_args[0][0]
-            self.assertIn('Test Alert', call_args)
-            self.assertIn('Test message', call_args)
-            self.assertIn('INFO', call_args)
+        manager = NotificationManager(telegram_config)
+        
+        # Only warnings and errors go to the chat channels
+        assert self._dispatch(manager, manager.send_system_alert,
+                              "Test Alert", "Test message", "INFO").call_count == 0
+        mock_send = self._dispatch(manager, manager.send_system_alert,
+                                   "Test Alert", "Test message", "WARNING")
+        
+        assert mock_send.await_count == 1
+        
+        # Check if message contains alert details
+        call_args = mock_send.call_args.args[0]
+        assert 'Test Alert' in call_args
+        assert 'Test message' in call_args
+        assert 'WARNING' in call_args
     
-    def test_send_daily_summary(self):
+    def test_send_daily_summary(self, NotificationManager, telegram_config):
         """Test daily summary notification"""
-        manager = NotificationManager(self.test_config)
+        manager = NotificationManager(telegram_config)
         
         summary_data = {
             'total_trades': 10,
@@ -374,18 +400,12 @@ class TestNotificationManager(unittest.TestCase):
             'uptime': '8:30:00'
         }
         
-        with patch.object(manager, 'send_telegram_notification', return_value=True) as mock_send:
-            result = manager.send_daily_summary(summary_data)
-            
-            self.assertTrue(result)
-            mock_send.assert_called_once()
-            
-            # Check if message contains summary details
-            call_args = mock_send.call_args[0][0]
-            self.assertIn('10', call_args)  # total_trades
-            self.assertIn('8', call_args)   # successful_copies
-            self.assertIn('2', call_args)   # failed_copies
-
-if __name__ == '__main__':
-    # Run tests with verbose output
-    unittest.main(verbosity=2)
+        mock_send = self._dispatch(manager, manager.send_daily_summary, summary_data)
+        
+        assert mock_send.await_count == 1
+        
+        # Check if message contains summary details
+        call_args = mock_send.call_args.args[0]
+        assert 'Total Trades: 10' in call_args
+        assert 'Successful Copies: 8' in call_args
+        assert 'Failed Copies: 2' in call_args
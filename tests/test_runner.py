@@ -14,129 +14,193 @@ Features:
 - Performance metrics
 """
 
-import unittest
 import sys
 import os
+import json
 import time
 import argparse
-from io import StringIO
+import importlib.util
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import defaultdict
 from datetime import datetime
 
+import pytest
+
 # Add the project root to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+# Node ids collected per test file, keyed by file name: {name: [mtime_ns, [node ids]]}
+TEST_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.testcache.json')
+
+class PytestResult:
+    """Outcome of a pytest run, with counts read from its JUnit XML report"""
+    
+    def __init__(self, exit_code, junit_path):
+        self.exit_code = exit_code
+        self.testsRun = 0
+        self.failures = 0
+        self.errors = 0
+        self.skipped = 0
+        
+        if os.path.exists(junit_path):
+            for suite in ET.parse(junit_path).getroot().iter('testsuite'):
+                self.testsRun += int(suite.get('tests', 0))
+                self.failures += int(suite.get('failures', 0))
+                self.errors += int(suite.get('errors', 0))
+                self.skipped += int(suite.get('skipped', 0))
+    
+    def wasSuccessful(self):
+        """Mirror unittest's TestResult.wasSuccessful()"""
+        return self.exit_code == pytest.ExitCode.OK
+
+def write_block(lines):
+    """Write several report lines with a single write and flush"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+class NodeIdRecorder:
+    """pytest plugin that records which node ids ran from each test file"""
+    
+    def __init__(self):
+        self.node_ids = defaultdict(list)
+    
+    def pytest_runtest_logreport(self, report):
+        # Under xdist this fires in the controller for every worker's tests
+        if report.when == 'setup':
+            self.node_ids[os.path.basename(report.nodeid.split('::')[0])].append(report.nodeid)
 
-def run_tests(test_pattern=None, verbose=False, coverage=False):
+def _test_file_mtimes(start_dir):
+    """Stat every test module, plus conftest.py since its fixtures shape collection"""
+    return {
+        name: os.stat(os.path.join(start_dir, name)).st_mtime_ns
+        for name in sorted(os.listdir(start_dir))
+        if name == 'conftest.py' or (name.startswith('test_') and name.endswith('.py'))
+    }
+
+def _collection_targets(start_dir, mtimes):
+    """Cached node ids for unchanged test files, plain paths for the rest"""
+    try:
+        with open(TEST_CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    
+    # A changed conftest.py can change what every file collects
+    if cache.get('conftest.py', [None])[0] != mtimes.get('conftest.py'):
+        cache = {}
+    
+    targets = []
+    for name, mtime in mtimes.items():
+        if name == 'conftest.py':
+            continue
+        entry = cache.get(name)
+        if entry and entry[0] == mtime:
+            targets.extend(os.path.join(PROJECT_ROOT, node_id) for node_id in entry[1])
+        else:
+            targets.append(os.path.join(start_dir, name))
+    
+    return targets or [start_dir]
+
+def _save_collection_cache(mtimes, recorder):
+    """Remember the node ids each test file produced at its current mtime"""
+    cache = {name: [mtime, recorder.node_ids.get(name, [])] for name, mtime in mtimes.items()}
+    try:
+        with open(TEST_CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # The cache is only an optimization
+
+def run_tests(test_pattern=None, verbose=False, coverage=False, failed_first=False):
     """
     Run all tests with optional filtering and coverage reporting
     
+    Tests run under pytest; pytest.ini adds ``-n auto`` so pytest-xdist
+    spreads them across all cores.
+    
     Args:
         test_pattern (str): Pattern to filter tests (e.g., 'test_automated')
         verbose (bool): Enable verbose output
         coverage (bool): Enable coverage reporting
+        failed_first (bool): Run the tests that failed last time first
     
     Returns:
-        tuple: (test_result, test_runner)
+        PytestResult: exit code and test counts for the run
     """
     
-    # Discover and load tests
-    loader = unittest.TestLoader()
     start_dir = os.path.dirname(os.path.abspath(__file__))
     
-    if test_pattern:
-        suite = loader.loadTestsFromName(test_pattern)
-    else:
-        suite = loader.discover(start_dir, pattern='test_*.py')
+    # Unchanged files are passed as their cached node ids; a -k filtered
+    # run would record only a subset, so it neither reads nor writes the cache
+    mtimes = None if test_pattern else _test_file_mtimes(start_dir)
+    args = _collection_targets(start_dir, mtimes) if mtimes else [start_dir]
+    recorder = NodeIdRecorder()
     
-    # Create test runner
+    if test_pattern:
+        args += ['-k', test_pattern]
     if verbose:
-        verbosity = 2
-    else:
-        verbosity = 1
-    
-    runner = unittest.TextTestRunner(
-        verbosity=verbosity,
-        stream=sys.stdout,
-        descriptions=True,
-        failfast=False
-    )
+        args.append('-v')
+    if coverage:
+        # pytest-cov combines the per-worker data files that xdist produces
+        args += [f'--cov={PROJECT_ROOT}', '--cov-report=html', '--cov-report=term']
+    if failed_first:
+        # Order comes from .pytest_cache, which pytest keeps between runs
+        args.append('--failed-first')
     
     # Run tests
-    print("=" * 70)
-    print("ZERODHA COPY TRADING SYSTEM - TEST SUITE")
-    print("=" * 70)
-    print(f"Test Run Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Test Pattern: {test_pattern or 'All Tests'}")
-    print(f"Verbose Mode: {'Enabled' if verbose else 'Disabled'}")
-    print(f"Coverage: {'Enabled' if coverage else 'Disabled'}")
-    print("=" * 70)
-    print()
-    
-    start_time = time.time()
-    result = runner.run(suite)
-    end_time = time.time()
-    
-    # Print summary
-    print("\n" + "=" * 70)
-    print("TEST SUMMARY")
-    print("=" * 70)
-    print(f"Tests Run: {result.testsRun}")
-    print(f"Failures: {len(result.failures)}")
-    print(f"Errors: {len(result.errors)}")
-    print(f"Skipped: {len(result.skipped) if hasattr(result, 'skipped') else 0}")
-    print(f"Success Rate: {((result.testsRun - len(result.failures) - len(result.errors)) / result.testsRun * 100):.1f}%")
-    print(f"Duration: {end_time - start_time:.2f} seconds")
-    print("=" * 70)
-    
-    # Print failures and errors
-    if result.failures:
-        print("\nFAILURES:")
-        print("-" * 30)
-        for test, traceback in result.failures:
-            print(f"FAIL: {test}")
-            print(traceback)
-            print()
-    
-    if result.errors:
-        print("\nERRORS:")
-        print("-" * 30)
-        for test, traceback in result.errors:
-            print(f"ERROR: {test}")
-            print(traceback)
-            print()
-    
-    return result, runner
-
-def run_coverage_analysis():
-    """Run coverage analysis if coverage is available"""
-    try:
-        import coverage
-        
-        # Start coverage
-        cov = coverage.Coverage()
-        cov.start()
-        
-        # Run tests
-        result, runner = run_tests(verbose=True)
-        
-        # Stop coverage
-        cov.stop()
-        cov.save()
-        
-        # Generate report
-        print("\n" + "=" * 70)
-        print("COVERAGE REPORT")
-        print("=" * 70)
-        cov.report()
-        
-        # Generate HTML report
-        cov.html_report(directory='htmlcov')
-        print(f"\nHTML coverage report generated in 'htmlcov' directory")
+    write_block([
+        "=" * 70,
+        "ZERODHA COPY TRADING SYSTEM - TEST SUITE",
+        "=" * 70,
+        f"Test Run Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Test Pattern: {test_pattern or 'All Tests'}",
+        f"Verbose Mode: {'Enabled' if verbose else 'Disabled'}",
+        f"Coverage: {'Enabled' if coverage else 'Disabled'}",
+        "=" * 70,
+        ""
+    ])
+    
+    with tempfile.TemporaryDirectory() as report_dir:
+        junit_path = os.path.join(report_dir, 'results.xml')
         
-        return result, runner
+        start_time = time.time()
+        exit_code = pytest.main(args + [f'--junitxml={junit_path}'], plugins=[recorder])
+        end_time = time.time()
         
-    except ImportError:
-        print("\n⚠️  Coverage module not available. Install with: pip install coverage")
+        result = PytestResult(exit_code, junit_path)
+    
+    # Only runs that got through collection produce a complete set of node ids
+    if mtimes and exit_code in (pytest.ExitCode.OK, pytest.ExitCode.TESTS_FAILED):
+        _save_collection_cache(mtimes, recorder)
+    
+    # Print summary; pytest has already reported the individual failures
+    passed = result.testsRun - result.failures - result.errors - result.skipped
+    write_block([
+        "",
+        "=" * 70,
+        "TEST SUMMARY",
+        "=" * 70,
+        f"Tests Run: {result.testsRun}",
+        f"Failures: {result.failures}",
+        f"Errors: {result.errors}",
+        f"Skipped: {result.skipped}",
+        f"Success Rate: {(passed / result.testsRun * 100) if result.testsRun else 0.0:.1f}%",
+        f"Duration: {end_time - start_time:.2f} seconds",
+        "=" * 70
+    ])
+    
+    return result
+
+def run_coverage_analysis():
+    """Run coverage analysis if pytest-cov is available"""
+    if importlib.util.find_spec('pytest_cov') is None:
+        print("\n⚠️  pytest-cov not available. Install with: pip install pytest-cov")
         return run_tests(verbose=True)
+    
+    result = run_tests(verbose=True, coverage=True)
+    print(f"\nHTML coverage report generated in 'htmlcov' directory")
+    return result
 
 def run_specific_tests():
     """Run specific test categories"""
@@ -146,9 +210,9 @@ def run_specific_tests():
         '3': (None, 'All Tests')
     }
     
-    print("\nAvailable Test Categories:")
-    for key, (pattern, description) in test_categories.items():
-        print(f"  {key}. {description}")
+    write_block(["", "Available Test Categories:"] + [
+        f"  {key}. {description}" for key, (pattern, description) in test_categories.items()
+    ])
     
     choice = input("\nSelect test category (1-3): ").strip()
     
@@ -167,18 +231,20 @@ def main():
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose output')
     parser.add_argument('--coverage', '-c', action='store_true', help='Enable coverage reporting')
     parser.add_argument('--interactive', '-i', action='store_true', help='Interactive test selection')
+    parser.add_argument('--failed-first', '-f', action='store_true', help='Run previously failing tests first')
     
     args = parser.parse_args()
     
     if args.interactive:
-        result, runner = run_specific_tests()
+        result = run_specific_tests()
     elif args.coverage:
-        result, runner = run_coverage_analysis()
+        result = run_coverage_analysis()
     else:
-        result, runner = run_tests(
+        result = run_tests(
             test_pattern=args.pattern,
             verbose=args.verbose,
-            coverage=args.coverage
+            coverage=args.coverage,
+            failed_first=args.failed_first
         )
     
     # Exit with appropriate code
@@ -186,7 +252,7 @@ def main():
         print("\n✅ All tests passed!")
         sys.exit(0)
     else:
-        print(f"\n❌ {len(result.failures + result.errors)} test(s) failed!")
+        print(f"\n❌ {result.failures + result.errors} test(s) failed!")
         sys.exit(1)
 
 if __name__ == '__main__':
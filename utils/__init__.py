@@ -6,6 +6,7 @@ Contains utility scripts and helper functions:
 - smart_position_check.py: Position viewer and credential tester
 - check_positions.py: Position checker for encrypted credentials
 - refresh_tokens.py: Daily access token refresh utility
+- token_cache.py: Per-API-key access token cache shared by the scripts
 """
 
 __all__ = []
@@ -3,11 +3,11 @@
 Automated Token Generator and Trade Monitor
 ==========================================
 
-This script provides automated access token generation using Selenium
-and real-time trade monitoring with Telegram notifications.
+This script provides automated access token generation through Kite's
+login API and real-time trade monitoring with Telegram notifications.
 
 Features:
-- Automated token generation using Selenium WebDriver
+- Automated token generation without a browser
 - Real-time trade monitoring
 - Telegram notifications for completed trades
 - Secure credential management via environment variables
@@ -21,24 +21,27 @@ Security:
 
 import os
 import time
+import hmac
+import hashlib
+import threading
+import collections
+import concurrent.futures
 import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
-import pyotp
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import logging
-import hashlib
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
-from kiteconnect import KiteConnect
 from dotenv import load_dotenv
 
+# orjson is optional; it serializes straight to bytes and falls back to json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
@@ -46,26 +49,145 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Kite web login endpoints, driven directly instead of through a browser
+KITE_LOGIN_URL = "https://kite.zerodha.com/api/login"
+KITE_TWOFA_URL = "https://kite.zerodha.com/api/twofa"
+
+# Redirect hops to follow from the Connect login URL to the request_token
+_MAX_LOGIN_REDIRECTS = 5
+
+# Instance attribute and environment variable for each required credential
+_CRED_MAP = (
+    ('USER_ID', 'AUTOMATED_USER_ID'),
+    ('PASSWORD', 'AUTOMATED_PASSWORD'),
+    ('API_KEY', 'AUTOMATED_API_KEY'),
+    ('API_SECRET', 'AUTOMATED_API_SECRET'),
+    ('AUTH_SECRET', 'AUTOMATED_AUTH_SECRET'),
+    ('TELEGRAM_TOKEN', 'TELEGRAM_BOT_TOKEN'),
+    ('TELEGRAM_CHAT_ID', 'TELEGRAM_CHAT_ID')
+)
+
+# Printed after the list of missing credentials
+_MISSING_HELP = """
+Example .env entries:
+AUTOMATED_USER_ID=your_user_id
+AUTOMATED_PASSWORD=your_password
+AUTOMATED_API_KEY=your_api_key
+AUTOMATED_API_SECRET=your_api_secret
+AUTOMATED_AUTH_SECRET=your_auth_secret
+TELEGRAM_BOT_TOKEN=your_telegram_bot_token
+TELEGRAM_CHAT_ID=your_telegram_chat_id"""
+
+# Generated token and Telegram settings, written by automated_token_generation
+CONFIG_FILE = 'automated_config.json'
+
+# Telegram rejects messages longer than this many characters
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Seconds before the order book is re-read after a notification failed; the
+# old polling loop retried every 15 seconds
+NOTIFY_RETRY_SECONDS = 15
+
+# Separates the per-order messages combined into one notification
+_BATCH_SEPARATOR = "\n\n---\n\n"
+
+# Telegram HTML for a single trade, filled by format_trade_message
+_TRADE_TEMPLATE = (
+    "{emoji} <b>{transaction_type}</b> - <code>{symbol}</code>\n"
+    "\n"
+    "📊 <b>Qty:</b> {quantity:,} | <b>Price:</b> ₹{price:,.2f}\n"
+    "💰 <b>Total:</b> ₹{total:,.2f}\n"
+    "🕐 <b>Time:</b> {time}\n"
+    "\n"
+    "Today: {trade_count} trades | Happy Trading! 📈"
+)
+
+def verify_postback_checksum(order, api_secret):
+    """Check a Kite postback's checksum: SHA-256 of order_id + order_timestamp + api_secret"""
+    expected = hashlib.sha256(
+        f"{order.get('order_id', '')}{order.get('order_timestamp', '')}{api_secret}".encode()
+    ).hexdigest()
+    return hmac.compare_digest(expected, str(order.get('checksum', '')))
+
+def make_postback_handler(system):
+    """HTTP handler class that feeds verified Kite order postbacks to ``system``"""
+    
+    class PostbackHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                order = json.loads(self.rfile.read(length))
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            
+            if not isinstance(order, dict) or not verify_postback_checksum(order, system.API_SECRET):
+                self.send_response(403)
+                self.end_headers()
+                return
+            
+            system.on_order_update(None, order)
+            self.send_response(200)
+            self.end_headers()
+        
+        def log_message(self, format, *args):
+            logger.debug("Postback: " + format, *args)
+    
+    return PostbackHandler
+
+def _json_dumps(data):
+    """Serialize data to indented JSON bytes, keeping the config file readable"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode()
+
+def _json_loads(raw):
+    """Parse JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 class AutomatedKiteSystem:
     def __init__(self):
         """Initialize automated kite system with secure credential loading"""
-        # Load credentials from environment variables
-        self.USER_ID = os.getenv('AUTOMATED_USER_ID', '')
-        self.PASSWORD = os.getenv('AUTOMATED_PASSWORD', '')
-        self.API_KEY = os.getenv('AUTOMATED_API_KEY', '')
-        self.API_SECRET = os.getenv('AUTOMATED_API_SECRET', '')
-        self.AUTH_SECRET = os.getenv('AUTOMATED_AUTH_SECRET', '')
-        
-        # Telegram credentials
-        self.TELEGRAM_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
-        self.TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '')
+        # Load credentials (Zerodha and Telegram) from environment variables
+        env = os.environ
+        for attr, key in _CRED_MAP:
+            setattr(self, attr, env.get(key, ''))
         
         # System state
-        self.driver = None
         self.kite = None
-        self.processed_orders = set()
+        # Insertion-ordered so eviction drops the oldest orders first
+        self.processed_orders = collections.OrderedDict()
+        
+        # Postbacks, ticker callbacks and finished sends arrive on different
+        # threads; updates to the order state are serialized
+        self._orders_lock = threading.Lock()
+        self._inflight_orders = set()
+        # Pending re-read of the order book after a failed send; None when idle
+        self._retry_timer = None
+        self._retries_stopped = False
         self.trade_count = 0
         
+        # Reuse one connection to api.telegram.org across notifications, and
+        # retry briefly when Telegram rate-limits or its gateway hiccups
+        self.http = requests.Session()
+        self.http.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.3,
+                status_forcelist=[429, 502, 503, 504],
+                allowed_methods={'POST'},  # sendMessage is a POST; urllib3 skips those by default
+                raise_on_status=False      # hand the last response back to the status check
+            )
+        ))
+        
+        # Sends each notification batch on its own thread; they are I/O-bound
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        
         # Validate credentials
         self._validate_credentials()
         
@@ -73,37 +195,30 @@ class AutomatedKiteSystem:
     
     def _validate_credentials(self):
         """Validate that all required credentials are provided"""
-        required_credentials = {
-            'AUTOMATED_USER_ID': self.USER_ID,
-            'AUTOMATED_PASSWORD': self.PASSWORD,
-            'AUTOMATED_API_KEY': self.API_KEY,
-            'AUTOMATED_API_SECRET': self.API_SECRET,
-            'AUTOMATED_AUTH_SECRET': self.AUTH_SECRET,
-            'TELEGRAM_BOT_TOKEN': self.TELEGRAM_TOKEN,
-            'TELEGRAM_CHAT_ID': self.TELEGRAM_CHAT_ID
-        }
-        
-        missing_credentials = [key for key, value in required_credentials.items() if not value.strip()]
+        # Empty or whitespace-only values count as missing
+        missing_credentials = []
+        for attr, key in _CRED_MAP:
+            value = getattr(self, attr)
+            if not value or value.isspace():
+                missing_credentials.append(key)
         
         if missing_credentials:
             logger.error(f"Missing required credentials: {', '.join(missing_credentials)}")
             print("\n❌ MISSING CREDENTIALS!")
             print("Please set the following environment variables in your .env file:")
-            for cred in missing_credentials:
-                print(f"  - {cred}")
-            print("\nExample .env entries:")
-            print("AUTOMATED_USER_ID=your_user_id")
-            print("AUTOMATED_PASSWORD=your_password")
-            print("AUTOMATED_API_KEY=your_api_key")
-            print("AUTOMATED_API_SECRET=your_api_secret")
-            print("AUTOMATED_AUTH_SECRET=your_auth_secret")
-            print("TELEGRAM_BOT_TOKEN=your_telegram_bot_token")
-            print("TELEGRAM_CHAT_ID=your_telegram_chat_id")
+            print("\n".join(f"  - {cred}" for cred in missing_credentials))
+            print(_MISSING_HELP)
             raise ValueError("Missing required credentials")
     
     def automated_token_generation(self):
-        """Generate access token using automated Selenium method"""
+        """Generate access token by driving Kite's login API directly"""
         try:
+            # The Kite client and pyotp are only needed for the login flow;
+            # importing them lazily keeps them off the import path of
+            # everything else in this module
+            import pyotp
+            from kiteconnect import KiteConnect
+
             print("🤖 STEP 1: AUTOMATED TOKEN GENERATION")
             print("-" * 40)
             
@@ -114,52 +229,40 @@ class AutomatedKiteSystem:
             
             print(f"🔑 Generated OTP: {otp} (expires in {remaining}s)")
             
-            # Setup Chrome with security options
-            chrome_options = Options()
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
-            self.driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=chrome_options
-            )
-            
-            # Execute script to remove webdriver property
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            # Navigate and login
-            login_url = f"https://kite.zerodha.com/connect/login?api_key={self.API_KEY}&v=3"
-            print(f"🌐 Opening: {login_url}")
-            
-            self.driver.get(login_url)
-            wait = WebDriverWait(self.driver, 15)
-            
-            # Enter credentials
-            print("📝 Entering User ID...")
-            userid_box = wait.until(EC.presence_of_element_located((By.ID, "userid")))
-            userid_box.clear()
-            userid_box.send_keys(self.USER_ID)
-            userid_box.send_keys(Keys.RETURN)
-            
-            print("🔒 Entering Password...")
-            password_box = wait.until(EC.presence_of_element_located((By.ID, "password")))
-            password_box.clear()
-            password_box.send_keys(self.PASSWORD)
-            password_box.send_keys(Keys.RETURN)
-            
-            print("🔐 Entering OTP...")
-            otp_box = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "form.twofa-form input[type='number']")))
-            otp_box.clear()
-            otp_box.send_keys(otp)
-            otp_box.send_keys(Keys.RETURN)
-            
-            time.sleep(5)
+            with requests.Session() as session:
+                # Enter credentials
+                print("📝 Logging in...")
+                response = session.post(KITE_LOGIN_URL, data={
+                    "user_id": self.USER_ID,
+                    "password": self.PASSWORD
+                }, timeout=10)
+                response.raise_for_status()
+                request_id = response.json()["data"]["request_id"]
+                
+                print("🔐 Submitting OTP...")
+                response = session.post(KITE_TWOFA_URL, data={
+                    "user_id": self.USER_ID,
+                    "request_id": request_id,
+                    "twofa_value": otp,
+                    "twofa_type": "totp"
+                }, timeout=10)
+                response.raise_for_status()
+                
+                # The logged-in session is redirected to the app's redirect URL;
+                # follow the hops by hand so the final URL is never fetched
+                redirect_url = f"https://kite.zerodha.com/connect/login?api_key={self.API_KEY}&v=3"
+                print(f"🌐 Opening: {redirect_url}")
+                
+                for _ in range(_MAX_LOGIN_REDIRECTS):
+                    response = session.get(redirect_url, allow_redirects=False, timeout=10)
+                    location = response.headers.get("Location")
+                    if not location:
+                        break
+                    redirect_url = urllib.parse.urljoin(redirect_url, location)
+                    if "request_token=" in redirect_url:
+                        break
             
             # Extract token
-            redirect_url = self.driver.current_url
             print(f"📍 Redirect URL: {redirect_url}")
             
             parsed = urllib.parse.urlparse(redirect_url)
@@ -192,10 +295,10 @@ class AutomatedKiteSystem:
                 "generated_at": datetime.now().isoformat()
             }
             
-            with open('automated_config.json', 'w') as f:
-                json.dump(config, f, indent=4)
-            
-            print("✅ Config saved to automated_config.json")
+            if self._save_config(config):
+                print(f"✅ Config saved to {CONFIG_FILE}")
+            else:
+                print(f"✅ {CONFIG_FILE} already up to date")
             
             return access_token
             
@@ -203,10 +306,40 @@ class AutomatedKiteSystem:
             logger.error(f"Token generation failed: {e}")
             print(f"❌ Token generation failed: {e}")
             return None
-            
-        finally:
-            if self.driver:
-                self.driver.quit()
+    
+    @staticmethod
+    def _save_config(config, path=CONFIG_FILE):
+        """Write config atomically, skipping the write when only generated_at differs
+        
+        Returns True when the file was written.
+        """
+        try:
+            with open(path, 'rb') as f:
+                existing = _json_loads(f.read())
+        except (OSError, ValueError):
+            existing = None
+        
+        if (isinstance(existing, dict) and
+                {k: v for k, v in existing.items() if k != 'generated_at'} ==
+                {k: v for k, v in config.items() if k != 'generated_at'}):
+            return False
+        
+        # A crash mid-write leaves the old file intact rather than a truncated one
+        tmp_path = path + '.tmp'
+        try:
+            # Holds the access token and the Telegram bot token, so it is
+            # owner-only from the moment it exists
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_json_dumps(config))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return True
     
     def send_trade_notification(self, message):
         """Send trade notification to Telegram"""
@@ -222,7 +355,7 @@ class AutomatedKiteSystem:
                 "parse_mode": "HTML"
             }
             
-            response = requests.post(url, data=payload, timeout=10)
+            response = self.http.post(url, data=payload, timeout=10)
             if response.status_code == 200:
                 print("✅ Telegram notification sent")
                 return True
@@ -235,29 +368,30 @@ class AutomatedKiteSystem:
             print(f"❌ Notification error: {e}")
             return False
     
-    def format_trade_message(self, order):
-        """Format trade message for Telegram"""
+    def format_trade_message(self, order, current_time=None):
+        """Format trade message for Telegram
+        
+        ``current_time`` lets a caller formatting several orders read the
+        clock once; it defaults to now.
+        """
         try:
-            symbol = order.get('tradingsymbol', 'N/A')
             transaction_type = order.get('transaction_type', 'N/A')
             quantity = order.get('quantity', 0)
             price = order.get('price', 0) or order.get('average_price', 0)
-            
-            emoji = "🟢" if transaction_type == "BUY" else "🔴"
             total = float(quantity) * float(price) if price else 0
-            current_time = datetime.now().strftime("%H:%M:%S")
             
             self.trade_count += 1
             
-            message = f"""{emoji} <b>{transaction_type}</b> - <code>{symbol}</code>
-
-📊 <b>Qty:</b> {quantity:,} | <b>Price:</b> ₹{price:,.2f}
-💰 <b>Total:</b> ₹{total:,.2f}
-🕐 <b>Time:</b> {current_time}
-
-Today: {self.trade_count} trades | Happy Trading! 📈"""
-            
-            return message.strip()
+            return _TRADE_TEMPLATE.format_map({
+                'emoji': "🟢" if transaction_type == "BUY" else "🔴",
+                'transaction_type': transaction_type,
+                'symbol': order.get('tradingsymbol', 'N/A'),
+                'quantity': quantity,
+                'price': price,
+                'total': total,
+                'time': current_time or datetime.now().strftime("%H:%M:%S"),
+                'trade_count': self.trade_count
+            })
             
         except Exception as e:
             logger.error(f"Message format error: {e}")
@@ -265,41 +399,140 @@ Today: {self.trade_count} trades | Happy Trading! 📈"""
     
     def generate_order_id(self, order):
         """Generate unique ID for order tracking"""
-        data = f"{order.get('order_id')}-{order.get('status')}-{order.get('tradingsymbol')}"
-        return hashlib.md5(data.encode()).hexdigest()[:12]
+        # Kite's order_id is already unique; status and symbol let a known
+        # order be picked up again when it changes state
+        return (order.get('order_id'), order.get('status'), order.get('tradingsymbol'))
     
     def monitor_trades(self):
-        """Monitor trades and send notifications"""
+        """Catch up on the order book and notify completed orders not seen yet
+        
+        Returns the futures of the notification sends it queued.
+        """
         try:
             if not self.kite:
                 print("❌ Kite client not initialized")
-                return
+                return []
                 
             orders = self.kite.orders()
-            
-            for order in orders:
-                order_unique_id = self.generate_order_id(order)
-                status = order.get('status', '').upper()
-                
-                if (status in ['COMPLETE', 'EXECUTED'] and 
-                    order_unique_id not in self.processed_orders):
-                    
-                    message = self.format_trade_message(order)
-                    success = self.send_trade_notification(message)
-                    
-                    if success:
-                        self.processed_orders.add(order_unique_id)
-                        print(f"✅ Logged: {order.get('tradingsymbol')} - {order.get('transaction_type')}")
-                    else:
-                        print(f"❌ Failed to notify: {order.get('order_id')}")
-            
-            # Keep memory clean
-            if len(self.processed_orders) > 50:
-                self.processed_orders = set(list(self.processed_orders)[-25:])
+            with self._orders_lock:
+                futures = self._notify_new_orders(orders)
+                self._trim_processed_orders()
+            return futures
                 
         except Exception as e:
             logger.error(f"Trade monitoring error: {e}")
             print(f"❌ Trade monitoring error: {e}")
+            return []
+    
+    def _notify_new_orders(self, orders):
+        """Queue notifications for completed orders not seen before, batched into as few messages as fit
+        
+        Returns the futures of the queued sends without waiting on them; callers
+        hold _orders_lock.
+        """
+        pending = {}
+        for order in orders:
+            order_unique_id = self.generate_order_id(order)
+            status = order.get('status', '').upper()
+            
+            if (status in ['COMPLETE', 'EXECUTED'] and 
+                order_unique_id not in self.processed_orders and
+                order_unique_id not in self._inflight_orders and
+                order_unique_id not in pending):
+                pending[order_unique_id] = order
+        
+        current_time = datetime.now().strftime("%H:%M:%S")
+        batches, batch, size = [], [], 0
+        for order_unique_id, order in pending.items():
+            message = self.format_trade_message(order, current_time)
+            if batch and size + len(_BATCH_SEPARATOR) + len(message) > TELEGRAM_MESSAGE_LIMIT:
+                batches.append(batch)
+                batch, size = [], 0
+            size += len(message) + (len(_BATCH_SEPARATOR) if batch else 0)
+            batch.append((order_unique_id, order, message))
+        
+        if batch:
+            batches.append(batch)
+        
+        # Orders stay in flight until their batch is sent, so a repeated
+        # update or a catch-up in the meantime does not notify them twice
+        self._inflight_orders.update(pending)
+        return [self.pool.submit(self._send_batch, batch) for batch in batches]
+    
+    def _send_batch(self, batch):
+        """Send one batch of (order_unique_id, order, message) entries and record the outcome"""
+        success = self.send_trade_notification(
+            _BATCH_SEPARATOR.join(message for _, _, message in batch))
+        with self._orders_lock:
+            self._record_batch(batch, success)
+            self._trim_processed_orders()
+            if not success:
+                self._schedule_retry()
+        return success
+    
+    def _schedule_retry(self):
+        """Re-read the order book shortly so failed orders are notified again
+        
+        Order updates are pushed rather than polled, so nothing else would
+        revisit them. Callers hold _orders_lock.
+        """
+        if self._retry_timer is not None or self._retries_stopped:
+            return
+        self._retry_timer = threading.Timer(NOTIFY_RETRY_SECONDS, self._retry_failed)
+        self._retry_timer.daemon = True
+        self._retry_timer.start()
+    
+    def _retry_failed(self):
+        """Timer callback: catch up on the order book, which re-queues the failed orders"""
+        with self._orders_lock:
+            self._retry_timer = None
+        self.monitor_trades()
+    
+    def _stop_retries(self):
+        """Cancel any pending retry and schedule no more; called before the pool shuts down"""
+        with self._orders_lock:
+            self._retries_stopped = True
+            if self._retry_timer is not None:
+                self._retry_timer.cancel()
+                self._retry_timer = None
+    
+    def _record_batch(self, batch, success):
+        """Mark (order_unique_id, order, message) entries processed once their batch was sent"""
+        for order_unique_id, order, _ in batch:
+            self._inflight_orders.discard(order_unique_id)
+            if success:
+                self.processed_orders[order_unique_id] = None
+                print(f"✅ Logged: {order.get('tradingsymbol')} - {order.get('transaction_type')}")
+            else:
+                print(f"❌ Failed to notify: {order.get('order_id')}")
+    
+    def _trim_processed_orders(self):
+        """Keep memory clean by evicting the oldest processed orders"""
+        while len(self.processed_orders) > 50:
+            self.processed_orders.popitem(last=False)
+    
+    def on_order_update(self, ws, data):
+        """Callback for order updates pushed by KiteTicker or a postback
+        
+        Runs on the ticker's reactor thread, so the send is queued on the pool
+        and the callback returns without waiting for Telegram.
+        """
+        try:
+            with self._orders_lock:
+                return self._notify_new_orders([data])
+        except Exception as e:
+            logger.error(f"Order update error: {e}")
+            print(f"❌ Order update error: {e}")
+            return []
+    
+    def on_connect(self, ws, *args):
+        """Catch up on orders that completed while the ticker was not connected
+        
+        KiteTicker calls this after the first connect and after every successful
+        reconnect; kite.orders() blocks, so it runs on the pool rather than on
+        the reactor thread.
+        """
+        return self.pool.submit(self.monitor_trades)
     
     def run_automated_system(self):
         """Run complete automated system"""
@@ -341,19 +574,50 @@ Today: {self.trade_count} trades | Happy Trading! 📈"""
         print("💡 Press Ctrl+C to stop")
         print()
         
-        try:
-            while True:
-                self.monitor_trades()
-                time.sleep(15)  # Check every 15 seconds
-                
-        except KeyboardInterrupt:
-            print("\n🛑 Trade monitoring stopped")
-            
-            # Send stop notification
-            stop_msg = f"🛑 <b>Automated System Stopped</b>\n\nSession trades: {self.trade_count}\nThanks for using Automated Kite System! 👋"
-            self.send_trade_notification(stop_msg)
-            
-            return True
+        # Let Kite push order updates instead of polling the order book,
+        # catching up on anything that completed before updates arrive
+        postback_port = os.getenv('KITE_POSTBACK_PORT')
+        if postback_port:
+            # Kite POSTs order updates to the postback URL set in the developer
+            # console; that URL must reach this port (e.g. via a reverse proxy)
+            server = ThreadingHTTPServer(('', int(postback_port)), make_postback_handler(self))
+            print(f"📬 Listening for Kite postbacks on port {postback_port}")
+            # The socket is already bound, so postbacks arriving now queue up
+            self.monitor_trades()
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+                self._stop_retries()
+                self.pool.shutdown(wait=True)
+        else:
+            from kiteconnect import KiteTicker
+            
+            ticker = KiteTicker(self.API_KEY, access_token)
+            ticker.on_order_update = self.on_order_update
+            # Fires on the first connect and after every successful reconnect;
+            # on_reconnect fires on each attempt while still disconnected
+            ticker.on_connect = self.on_connect
+            
+            try:
+                # Blocks until the connection is closed; Ctrl+C stops the reactor
+                ticker.connect(threaded=False)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                ticker.close()
+                self._stop_retries()
+                self.pool.shutdown(wait=True)
+        
+        print("\n🛑 Trade monitoring stopped")
+        
+        # Send stop notification
+        stop_msg = f"🛑 <b>Automated System Stopped</b>\n\nSession trades: {self.trade_count}\nThanks for using Automated Kite System! 👋"
+        self.send_trade_notification(stop_msg)
+        
+        return True
 
 def main():
     """Main function"""
@@ -363,10 +627,9 @@ def main():
     
     # Prerequisites check
     print("📋 PREREQUISITES:")
-    print("1. Chrome browser installed")
-    print("2. All credentials set in .env file")
-    print("3. Stable internet connection")
-    print("4. Telegram bot configured (optional)")
+    print("1. All credentials set in .env file")
+    print("2. Stable internet connection")
+    print("3. Telegram bot configured (optional)")
     print()
     
     proceed = input("Ready to start? (y/n): ").lower().strip()
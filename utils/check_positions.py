@@ -10,9 +10,22 @@ import os
 import sys
 from kiteconnect import KiteConnect
 from kiteconnect.exceptions import KiteException
-from cryptography.fernet import Fernet
 import getpass
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import itemgetter, mul
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.token_cache import fernet_class
+
+# One host, four concurrent fetches in main(); keep that many connections alive
+KITE_POOL = {'pool_connections': 1, 'pool_maxsize': 4}
+
+# Row status indicators, indexed by `value >= 0`
+STATUS_ICONS = ("🔴", "🟢")
 
 def decrypt_credentials():
     """Decrypt your encrypted credentials"""
@@ -33,7 +46,7 @@ def decrypt_credentials():
         return None, None
 
     try:
-        cipher = Fernet(encryption_key.encode())
+        cipher = fernet_class()(encryption_key.encode())
 
         api_key = cipher.decrypt(encrypted_api_key.encode()).decode()
         api_secret = cipher.decrypt(encrypted_api_secret.encode()).decode()
@@ -52,7 +65,7 @@ def get_access_token(api_key, api_secret):
     """Generate access token for API access"""
 
     try:
-        kite = KiteConnect(api_key=api_key)
+        kite = KiteConnect(api_key=api_key, pool=KITE_POOL)
         login_url = kite.login_url()
 
         print(f"\n🔑 ACCESS TOKEN GENERATION")
@@ -66,57 +79,60 @@ def get_access_token(api_key, api_secret):
 
         if not request_token:
             print("❌ Request token is required!")
-            return None, None
+            return None
 
         # Generate session
         data = kite.generate_session(request_token, api_secret=api_secret)
         access_token = data["access_token"]
 
-        # Test the token
+        # An invalid token surfaces on the first real API call in main()
         kite.set_access_token(access_token)
-        profile = kite.profile()
 
         print(f"✅ Access token generated successfully!")
-        print(f"👤 Account: {profile['user_name']} ({profile['user_id']})")
 
-        return kite, profile
+        return kite
 
     except Exception as e:
         print(f"❌ Access token generation failed: {e}")
-        return None, None
+        return None
+
+def write_block(lines):
+    """Write several report lines with a single write and flush"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+# Indian-style currency tiers: thresholds for bisect, then (divisor, format spec, suffix)
+_CURRENCY_THRESHOLDS = (100000, 10000000)  # 1 lakh, 1 crore
+_CURRENCY_TIERS = ((1, ',.2f', ''), (100000, '.2f', 'L'), (10000000, '.2f', 'Cr'))
 
 def format_currency(amount):
-    """Format currency in Indian style"""
-    if amount >= 10000000:  # 1 crore
-        return f"₹{amount/10000000:.2f}Cr"
-    elif amount >= 100000:  # 1 lakh
-        return f"₹{amount/100000:.2f}L"
-    else:
-        return f"₹{amount:,.2f}"
+    """Format currency in Indian style; losses scale like gains, e.g. -₹1.23Cr"""
+    sign = "-" if amount < 0 else ""
+    magnitude = abs(amount)
+    divisor, spec, suffix = _CURRENCY_TIERS[bisect_right(_CURRENCY_THRESHOLDS, magnitude)]
+    return f"{sign}₹{format(magnitude / divisor, spec)}{suffix}"
 
-def display_positions(kite):
-    """Display current positions"""
+def display_positions(positions, lines):
+    """Append the current positions table from a kite.positions() response"""
 
-    print("\n" + "="*90)
-    print("📊 CURRENT POSITIONS")
-    print("="*90)
+    lines.extend(("\n" + "="*90, "📊 CURRENT POSITIONS", "="*90))
 
     try:
-        positions = kite.positions()
         net_positions = positions.get('net', [])
 
-        # Filter active positions
-        active_positions = [pos for pos in net_positions if pos['quantity'] != 0]
+        # Filter active positions; filter(itemgetter) keeps nonzero quantities in C
+        active_positions = list(filter(itemgetter('quantity'), net_positions))
 
         if not active_positions:
-            print("✅ No open positions found")
+            lines.append("✅ No open positions found")
             return
 
-        print(f"{'Symbol':<18} {'Exchange':<8} {'Qty':<8} {'Avg Price':<12} {'LTP':<10} {'P&L':<12} {'Day P&L':<10}")
-        print("-"*90)
+        lines.append(f"{'Symbol':<18} {'Exchange':<8} {'Qty':<8} {'Avg Price':<12} {'LTP':<10} {'P&L':<12} {'Day P&L':<10}")
+        lines.append("-"*90)
 
-        total_pnl = 0
-        total_day_pnl = 0
+        # Column totals: sum(map(itemgetter)) reduces without per-row bytecode
+        total_pnl = sum(map(itemgetter('pnl'), active_positions))
+        total_day_pnl = sum(map(itemgetter('day_pnl'), active_positions))
 
         for pos in active_positions:
             symbol = pos['tradingsymbol'][:17]
@@ -127,48 +143,43 @@ def display_positions(kite):
             pnl = pos['pnl']
             day_pnl = pos['day_pnl']
 
-            total_pnl += pnl
-            total_day_pnl += day_pnl
-
             # Status indicators
-            pnl_status = "🟢" if pnl >= 0 else "🔴"
-            day_status = "🟢" if day_pnl >= 0 else "🔴"
+            pnl_status = STATUS_ICONS[pnl >= 0]
+            day_status = STATUS_ICONS[day_pnl >= 0]
 
-            print(f"{symbol:<18} {exchange:<8} {qty:<8} {avg_price:<12.2f} {ltp:<10.2f} {pnl:+8.2f}{pnl_status} {day_pnl:+8.2f}{day_status}")
+            lines.append(f"{symbol:<18} {exchange:<8} {qty:<8} {avg_price:<12.2f} {ltp:<10.2f} {pnl:+8.2f}{pnl_status} {day_pnl:+8.2f}{day_status}")
 
-        print("-"*90)
-        print(f"{'TOTAL':<58} {total_pnl:+12.2f} {total_day_pnl:+10.2f}")
-        print(f"Active Positions: {len(active_positions)}")
+        lines.append("-"*90)
+        lines.append(f"{'TOTAL':<58} {total_pnl:+12.2f} {total_day_pnl:+10.2f}")
+        lines.append(f"Active Positions: {len(active_positions)}")
 
         # Overall status
         if total_pnl >= 0:
-            print(f"📈 Overall P&L: {format_currency(total_pnl)} (PROFIT)")
+            lines.append(f"📈 Overall P&L: {format_currency(total_pnl)} (PROFIT)")
         else:
-            print(f"📉 Overall P&L: {format_currency(total_pnl)} (LOSS)")
+            lines.append(f"📉 Overall P&L: {format_currency(total_pnl)} (LOSS)")
 
     except Exception as e:
-        print(f"❌ Error fetching positions: {e}")
+        lines.append(f"❌ Error displaying positions: {e}")
 
-def display_holdings(kite):
-    """Display current holdings"""
+def display_holdings(holdings, lines):
+    """Append the current holdings table from a kite.holdings() response"""
 
-    print("\n" + "="*90)
-    print("💰 CURRENT HOLDINGS")
-    print("="*90)
+    lines.extend(("\n" + "="*90, "💰 CURRENT HOLDINGS", "="*90))
 
     try:
-        holdings = kite.holdings()
-
         if not holdings:
-            print("✅ No holdings found")
+            lines.append("✅ No holdings found")
             return
 
-        print(f"{'Symbol':<18} {'Exchange':<8} {'Qty':<8} {'Avg Price':<12} {'LTP':<10} {'P&L':<12} {'Day Chg%':<8}")
-        print("-"*90)
+        lines.append(f"{'Symbol':<18} {'Exchange':<8} {'Qty':<8} {'Avg Price':<12} {'LTP':<10} {'P&L':<12} {'Day Chg%':<8}")
+        lines.append("-"*90)
 
-        total_investment = 0
-        total_current_value = 0
-        total_pnl = 0
+        # Column totals: sum(map(itemgetter)) reduces without per-row bytecode
+        qtys = list(map(itemgetter('quantity'), holdings))
+        total_investment = sum(map(mul, qtys, map(itemgetter('average_price'), holdings)))
+        total_current_value = sum(map(mul, qtys, map(itemgetter('last_price'), holdings)))
+        total_pnl = sum(map(itemgetter('pnl'), holdings))
 
         for holding in holdings:
             symbol = holding['tradingsymbol'][:17]
@@ -179,42 +190,32 @@ def display_holdings(kite):
             pnl = holding['pnl']
             day_change = holding['day_change']
 
-            investment = qty * avg_price
-            current_value = qty * ltp
             day_change_pct = (day_change / ltp * 100) if ltp > 0 else 0
 
-            total_investment += investment
-            total_current_value += current_value
-            total_pnl += pnl
-
             # Status indicators
-            pnl_status = "🟢" if pnl >= 0 else "🔴"
-            day_status = "🟢" if day_change >= 0 else "🔴"
+            pnl_status = STATUS_ICONS[pnl >= 0]
+            day_status = STATUS_ICONS[day_change >= 0]
 
-            print(f"{symbol:<18} {exchange:<8} {qty:<8} {avg_price:<12.2f} {ltp:<10.2f} {pnl:+8.2f}{pnl_status} {day_change_pct:+6.2f}%{day_status}")
+            lines.append(f"{symbol:<18} {exchange:<8} {qty:<8} {avg_price:<12.2f} {ltp:<10.2f} {pnl:+8.2f}{pnl_status} {day_change_pct:+6.2f}%{day_status}")
 
-        print("-"*90)
-        print(f"Holdings: {len(holdings)} | Investment: {format_currency(total_investment)} | Current: {format_currency(total_current_value)}")
+        lines.append("-"*90)
+        lines.append(f"Holdings: {len(holdings)} | Investment: {format_currency(total_investment)} | Current: {format_currency(total_current_value)}")
 
         # Overall return
         if total_investment > 0:
             return_pct = ((total_current_value - total_investment) / total_investment) * 100
             status = "📈 GAINS" if return_pct >= 0 else "📉 LOSSES"
-            print(f"Overall Return: {format_currency(total_pnl)} ({return_pct:+.2f}%) {status}")
+            lines.append(f"Overall Return: {format_currency(total_pnl)} ({return_pct:+.2f}%) {status}")
 
     except Exception as e:
-        print(f"❌ Error fetching holdings: {e}")
+        lines.append(f"❌ Error displaying holdings: {e}")
 
-def display_margins(kite):
-    """Display margin information"""
+def display_margins(margins, lines):
+    """Append the margin summary from a kite.margins() response"""
 
-    print("\n" + "="*70)
-    print("💳 MARGIN SUMMARY")
-    print("="*70)
+    lines.extend(("\n" + "="*70, "💳 MARGIN SUMMARY", "="*70))
 
     try:
-        margins = kite.margins()
-
         # Equity margins
         equity = margins.get('equity', {})
         if equity:
@@ -226,16 +227,16 @@ def display_margins(kite):
             used_margin = utilised.get('debits', 0)
             free_margin = live_balance - used_margin
 
-            print("🔸 EQUITY SEGMENT:")
-            print(f"  Available Cash: {format_currency(cash)}")
-            print(f"  Total Margin: {format_currency(live_balance)}")
-            print(f"  Used Margin: {format_currency(used_margin)}")
-            print(f"  Free Margin: {format_currency(free_margin)}")
+            lines.append("🔸 EQUITY SEGMENT:")
+            lines.append(f"  Available Cash: {format_currency(cash)}")
+            lines.append(f"  Total Margin: {format_currency(live_balance)}")
+            lines.append(f"  Used Margin: {format_currency(used_margin)}")
+            lines.append(f"  Free Margin: {format_currency(free_margin)}")
 
             # Margin utilization percentage
             if live_balance > 0:
                 utilization = (used_margin / live_balance) * 100
-                print(f"  Utilization: {utilization:.1f}%")
+                lines.append(f"  Utilization: {utilization:.1f}%")
 
         # Commodity margins
         commodity = margins.get('commodity', {})
@@ -246,34 +247,32 @@ def display_margins(kite):
             cash = available.get('cash', 0)
             used_margin = utilised.get('debits', 0)
 
-            print(f"\n🔸 COMMODITY SEGMENT:")
-            print(f"  Available Cash: {format_currency(cash)}")
-            print(f"  Used Margin: {format_currency(used_margin)}")
+            lines.append(f"\n🔸 COMMODITY SEGMENT:")
+            lines.append(f"  Available Cash: {format_currency(cash)}")
+            lines.append(f"  Used Margin: {format_currency(used_margin)}")
 
     except Exception as e:
-        print(f"❌ Error fetching margins: {e}")
+        lines.append(f"❌ Error displaying margins: {e}")
 
-def display_account_summary(profile):
-    """Display account summary"""
+def display_account_summary(profile, lines):
+    """Append the account summary from a kite.profile() response"""
 
-    print("\n" + "="*70)
-    print("👤 ACCOUNT SUMMARY")
-    print("="*70)
+    lines.extend(("\n" + "="*70, "👤 ACCOUNT SUMMARY", "="*70))
 
-    print(f"Name: {profile.get('user_name', 'N/A')}")
-    print(f"User ID: {profile.get('user_id', 'N/A')}")
-    print(f"Email: {profile.get('email', 'N/A')}")
-    print(f"Mobile: {profile.get('phone', 'N/A')}")
-    print(f"Broker: {profile.get('broker', 'Zerodha')}")
+    lines.append(f"Name: {profile.get('user_name', 'N/A')}")
+    lines.append(f"User ID: {profile.get('user_id', 'N/A')}")
+    lines.append(f"Email: {profile.get('email', 'N/A')}")
+    lines.append(f"Mobile: {profile.get('phone', 'N/A')}")
+    lines.append(f"Broker: {profile.get('broker', 'Zerodha')}")
 
     # Trading segments
     segments = profile.get('products', [])
     if segments:
-        print(f"Enabled Products: {', '.join(segments)}")
+        lines.append(f"Enabled Products: {', '.join(segments)}")
 
     exchanges = profile.get('exchanges', [])
     if exchanges:
-        print(f"Enabled Exchanges: {', '.join(exchanges)}")
+        lines.append(f"Enabled Exchanges: {', '.join(exchanges)}")
 
 def main():
     """Main function to check positions"""
@@ -292,25 +291,36 @@ def main():
             sys.exit(1)
 
         # Get access token and connect
-        kite, profile = get_access_token(api_key, api_secret)
-        if not kite or not profile:
+        kite = get_access_token(api_key, api_secret)
+        if not kite:
             sys.exit(1)
 
-        # Display account information
-        display_account_summary(profile)
-
-        # Display positions
-        display_positions(kite)
-
-        # Display holdings
-        display_holdings(kite)
-
-        # Display margins
-        display_margins(kite)
-
-        print(f"\n✅ Data retrieved successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("💡 Access tokens expire daily - you'll need to regenerate tomorrow")
-        print("🔄 Run this script anytime to check your current positions")
+        # Fetch profile, positions, holdings and margins concurrently; each
+        # is an independent round trip, so total wait is the slowest one
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            pending = {name: pool.submit(getattr(kite, name))
+                       for name in ('profile', 'positions', 'holdings', 'margins')}
+
+        # Every section goes into one list and reaches stdout in a single write
+        lines = []
+
+        # A failed profile() means the token is unusable; let it abort below
+        display_account_summary(pending['profile'].result(), lines)
+
+        for name, display in (('positions', display_positions),
+                              ('holdings', display_holdings),
+                              ('margins', display_margins)):
+            try:
+                data = pending[name].result()
+            except Exception as e:
+                lines.append(f"\n❌ Error fetching {name}: {e}")
+                continue
+            display(data, lines)
+
+        lines.append(f"\n✅ Data retrieved successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append("💡 Access tokens expire daily - you'll need to regenerate tomorrow")
+        lines.append("🔄 Run this script anytime to check your current positions")
+        write_block(lines)
 
     except KeyboardInterrupt:
         print("\n❌ Operation cancelled by user")
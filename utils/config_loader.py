@@ -15,15 +15,51 @@ Features:
 """
 
 import os
+import sys
+import copy
 import json
 import logging
+import functools
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from pathlib import Path
+from pydantic import TypeAdapter, ValidationError
+
+# orjson is optional; it parses and serializes bytes directly and falls back to json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+def _json_loads(raw):
+    """Parse JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _json_dumps(data):
+    """Serialize to indented JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode()
+
+def _cached(method):
+    """Memoize a ConfigLoader accessor until the next invalidate()"""
+    @functools.wraps(method)
+    def wrapper(self):
+        try:
+            return self._cache[method.__name__]
+        except KeyError:
+            value = self._cache[method.__name__] = method(self)
+            return value
+    return wrapper
+
+# slots=True needs Python 3.10; frozen keeps the memoized accessor results read-only
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_SLOTS)
 class KiteCredentials:
     """Kite credentials configuration"""
     user_id: str
@@ -33,13 +69,13 @@ class KiteCredentials:
     auth_secret: str
     access_token: str
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class TelegramConfig:
     """Telegram configuration"""
     bot_token: str
     chat_id: str
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class FollowerConfig:
     """Follower account configuration"""
     api_key: str
@@ -49,11 +85,11 @@ class FollowerConfig:
     multiplier: float = 1.0
     max_position_size: int = 1000
     enabled: bool = True
-    enabled_segments: List[str] = None
-    segment_multipliers: Dict[str, float] = None
-    segment_limits: Dict[str, int] = None
+    enabled_segments: Optional[List[str]] = None
+    segment_multipliers: Optional[Dict[str, float]] = None
+    segment_limits: Optional[Dict[str, int]] = None
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class SystemConfig:
     """System configuration"""
     paper_trading: bool = True
@@ -65,27 +101,51 @@ class SystemConfig:
     auto_token_refresh: bool = True
     market_hours_only: bool = True
 
+# Built once; pydantic-core validates each follower dict straight into a FollowerConfig
+_FOLLOWER_ADAPTER = TypeAdapter(FollowerConfig)
+
 class ConfigLoader:
     """Configuration loader with support for multiple formats"""
     
     def __init__(self, config_file: str = "config.json"):
         self.config_file = config_file
         self.config_data = {}
+        self._cache = {}
+        # Parsed file contents, kept apart from config_data so the environment
+        # overlay is applied to a fresh copy on every load
+        self._file_data = {}
+        self._file_key = None
+    
+    def invalidate(self):
+        """Drop cached accessor results; call after editing config_data directly"""
+        self._cache.clear()
     
     def load_config(self) -> Dict[str, Any]:
         """Load configuration from file and environment variables"""
-        # Try to load from JSON file first
-        if os.path.exists(self.config_file):
+        # Try to load from JSON file first; skip the parse if it is unchanged since the last load
+        try:
+            stat = Path(self.config_file).stat()
+        except OSError:
+            stat = None
+            self._file_data = {}
+            self._file_key = None
+        
+        if stat is not None and (stat.st_mtime_ns, stat.st_size) != self._file_key:
             try:
-                with open(self.config_file, 'r') as f:
-                    self.config_data = json.load(f)
+                with open(self.config_file, 'rb') as f:
+                    self._file_data = _json_loads(f.read())
+                self._file_key = (stat.st_mtime_ns, stat.st_size)
                 logger.info(f"Configuration loaded from {self.config_file}")
             except Exception as e:
                 logger.error(f"Error loading config file: {e}")
-                self.config_data = {}
+                self._file_data = {}
+                self._file_key = None
+        
+        self.config_data = copy.deepcopy(self._file_data)
         
         # Override with environment variables
         self._load_from_environment()
+        self.invalidate()
         
         return self.config_data
     
@@ -131,6 +191,7 @@ class ConfigLoader:
                 self.config_data['master_account'] = {}
             self.config_data['master_account'].update({k: v for k, v in master_env.items() if v})
     
+    @_cached
     def get_kite_credentials(self) -> Optional[KiteCredentials]:
         """Get Kite credentials from configuration"""
         kite_config = self.config_data.get('kite', {})
@@ -149,6 +210,7 @@ class ConfigLoader:
             access_token=kite_config['access_token']
         )
     
+    @_cached
     def get_telegram_config(self) -> Optional[TelegramConfig]:
         """Get Telegram configuration"""
         telegram_config = self.config_data.get('telegram', {})
@@ -162,6 +224,7 @@ class ConfigLoader:
             chat_id=telegram_config['chat_id']
         )
     
+    @_cached
     def get_follower_configs(self) -> List[FollowerConfig]:
         """Get follower configurations"""
         followers = []
@@ -169,24 +232,14 @@ class ConfigLoader:
         
         for i, config in enumerate(follower_configs):
             try:
-                follower = FollowerConfig(
-                    api_key=config['api_key'],
-                    api_secret=config['api_secret'],
-                    access_token=config['access_token'],
-                    user_id=config['user_id'],
-                    multiplier=config.get('multiplier', 1.0),
-                    max_position_size=config.get('max_position_size', 1000),
-                    enabled=config.get('enabled', True),
-                    enabled_segments=config.get('enabled_segments'),
-                    segment_multipliers=config.get('segment_multipliers'),
-                    segment_limits=config.get('segment_limits')
-                )
-                followers.append(follower)
-            except KeyError as e:
-                logger.error(f"Invalid follower configuration {i}: missing {e}")
+                followers.append(_FOLLOWER_ADAPTER.validate_python(config))
+            except ValidationError as e:
+                problems = ', '.join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                logger.error(f"Invalid follower configuration {i}: {problems}")
         
         return followers
     
+    @_cached
     def get_system_config(self) -> SystemConfig:
         """Get system configuration"""
         system_config = self.config_data.get('system', {})
@@ -202,6 +255,7 @@ class ConfigLoader:
             market_hours_only=system_config.get('market_hours_only', True)
         )
     
+    @_cached
     def validate_config(self) -> bool:
         """Validate the loaded configuration"""
         errors = []
@@ -237,8 +291,9 @@ class ConfigLoader:
             filename = self.config_file
         
         try:
-            with open(filename, 'w') as f:
-                json.dump(self.config_data, f, indent=4)
+            with open(filename, 'wb') as f:
+                f.write(_json_dumps(self.config_data))
+            self.invalidate()
             logger.info(f"Configuration saved to {filename}")
         except Exception as e:
             logger.error(f"Error saving configuration: {e}")
@@ -286,8 +341,8 @@ class ConfigLoader:
         }
         
         try:
-            with open(filename, 'w') as f:
-                json.dump(sample_config, f, indent=4)
+            with open(filename, 'wb') as f:
+                f.write(_json_dumps(sample_config))
             logger.info(f"Sample configuration created: {filename}")
         except Exception as e:
             logger.error(f"Error creating sample configuration: {e}")
@@ -9,12 +9,56 @@ or plain text and handles both cases.
 
 import os
 import sys
+import time
+import random
+import base64
+import hashlib
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from kiteconnect import KiteConnect
-from kiteconnect.exceptions import KiteException
-from cryptography.fernet import Fernet
-import getpass
+from kiteconnect.exceptions import (InputException, KiteException, NetworkException,
+                                    PermissionException, TokenException)
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
 from datetime import datetime
 
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.check_positions import format_currency
+from utils.token_cache import TOKEN_CACHE_DIR, load_cached_token, save_cached_token
+
+# orjson is optional; KiteConnect responses are parsed with it when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Pattern keys that might have been used to encrypt the credentials
+COMMON_KEYS = (
+    "zerodha_copy_trading_key",
+    "kitecopytrader_key_2024",
+    "copy_trading_system_key"
+)
+
+# Upper bounds on the pattern-key loop, however long COMMON_KEYS grows
+MAX_PATTERN_ATTEMPTS = 8
+PATTERN_TIME_BUDGET = 0.25  # seconds
+
+# Every Fernet token starts with version byte 0x80 and a 64-bit timestamp,
+# which base64-encodes to this prefix for any timestamp before the year 4000
+FERNET_TOKEN_PREFIX = "gAAAAA"
+
+@lru_cache(maxsize=1)
+def _common_ciphers():
+    """Fernet ciphers for COMMON_KEYS, derived once per process"""
+    from cryptography.fernet import Fernet
+
+    return tuple(
+        Fernet(base64.urlsafe_b64encode(hashlib.sha256(key.encode()).digest()))
+        for key in COMMON_KEYS
+    )
+
 def try_decrypt_credentials():
     """Try to decrypt credentials, fallback to plain text"""
 
@@ -25,17 +69,26 @@ def try_decrypt_credentials():
     print("🔐 CREDENTIAL PROCESSING")
     print("-" * 40)
 
+    if not credential_api_key or not credential_api_secret:
+        print("⚠️ No credentials found - set credential_api_key and credential_api_secret above")
+        return credential_api_key, credential_api_secret
+
     # Method 1: Try as plain text API credentials first
     print("🔍 Method 1: Testing as plain text API credentials...")
-    try:
-        # Check if these look like valid Zerodha API keys (they should be shorter)
-        if len(credential_api_key) < 50:  # Normal API keys are ~32 chars
-            print("✅ Credentials appear to be plain text")
-            return credential_api_key, credential_api_secret
-        else:
-            print("❌ Too long to be plain text API keys - likely encrypted")
-    except:
-        pass
+    # Check if these look like valid Zerodha API keys (they should be shorter)
+    if len(credential_api_key) < 50:  # Normal API keys are ~32 chars
+        print("✅ Credentials appear to be plain text")
+        return credential_api_key, credential_api_secret
+    else:
+        print("❌ Too long to be plain text API keys - likely encrypted")
+
+    # Only encrypted-looking credentials get this far; load the crypto stack now
+    import getpass
+    from cryptography.fernet import Fernet, InvalidToken
+
+    # Ciphertexts are the same for every key tried below
+    token_api_key = credential_api_key.encode()
+    token_api_secret = credential_api_secret.encode()
 
     # Method 2: Try to decrypt with user-provided key
     print("\n🔍 Method 2: Attempting decryption...")
@@ -47,14 +100,15 @@ def try_decrypt_credentials():
         try:
             cipher = Fernet(encryption_key.encode())
 
-            api_key = cipher.decrypt(credential_api_key.encode()).decode()
-            api_secret = cipher.decrypt(credential_api_secret.encode()).decode()
+            api_key = cipher.decrypt(token_api_key).decode()
+            api_secret = cipher.decrypt(token_api_secret).decode()
 
             print("✅ Credentials decrypted successfully!")
             print(f"📋 API Key: {api_key[:10]}...")
             return api_key, api_secret
 
-        except Exception as e:
+        except (InvalidToken, ValueError) as e:
+            # ValueError covers a malformed key and non-UTF-8 plaintext
             print(f"❌ Decryption failed: {e}")
     else:
         print("ℹ️ No encryption key provided, skipping decryption")
@@ -62,30 +116,26 @@ def try_decrypt_credentials():
     # Method 3: Try with common encryption keys or patterns
     print("\n🔍 Method 3: Trying common patterns...")
 
-    # Common keys that might have been used
-    common_keys = [
-        "zerodha_copy_trading_key",
-        "kitecopytrader_key_2024",
-        "copy_trading_system_key"
-    ]
+    if not credential_api_key.startswith(FERNET_TOKEN_PREFIX):
+        print("ℹ️ Credentials are not Fernet tokens, skipping pattern keys")
+        ciphers = ()
+    else:
+        ciphers = _common_ciphers()
 
-    for test_key in common_keys:
+    started = time.monotonic()
+    for attempt, cipher in enumerate(ciphers):
+        if attempt >= MAX_PATTERN_ATTEMPTS or time.monotonic() - started > PATTERN_TIME_BUDGET:
+            print("⚠️ Pattern key budget exhausted, stopping")
+            break
         try:
-            # Generate Fernet key from string
-            import base64
-            import hashlib
-            key_bytes = hashlib.sha256(test_key.encode()).digest()
-            fernet_key = base64.urlsafe_b64encode(key_bytes)
-            cipher = Fernet(fernet_key)
-
-            api_key = cipher.decrypt(credential_api_key.encode()).decode()
-            api_secret = cipher.decrypt(credential_api_secret.encode()).decode()
+            api_key = cipher.decrypt(token_api_key).decode()
+            api_secret = cipher.decrypt(token_api_secret).decode()
 
             print(f"✅ Decrypted with pattern key!")
             print(f"📋 API Key: {api_key[:10]}...")
             return api_key, api_secret
 
-        except:
+        except (InvalidToken, ValueError):
             continue
 
     # Method 4: Fallback - treat as plain text anyway
@@ -93,6 +143,57 @@ def try_decrypt_credentials():
     print("⚠️ Will attempt to use credentials as-is")
     return credential_api_key, credential_api_secret
 
+# Rate limit or server errors worth another attempt; token/input errors are not
+RETRYABLE_CODES = (429, 500, 502, 503, 504)
+
+def _with_retry(call, max_retries=3, base=1.0, cap=30.0):
+    """Call an idempotent Kite API function, retrying transient failures with jittered backoff
+
+    kiteconnect re-raises connection errors and timeouts from requests
+    unwrapped, so those are retried alongside Kite's own transient errors.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except (KiteException, RequestsConnectionError, Timeout) as e:
+            retryable = (not isinstance(e, KiteException) or
+                         isinstance(e, NetworkException) or e.code in RETRYABLE_CODES)
+            if not retryable or attempt == max_retries:
+                raise
+            wait_time = min(cap, base * (2 ** attempt) * (1 + random.random() * 0.5))
+            print(f"⏳ Kite API busy ({e}), retrying in {wait_time:.1f}s...")
+            time.sleep(wait_time)
+
+# One host, three concurrent fetches in the quick summary; keep that many connections alive
+KITE_POOL = {'pool_connections': 1, 'pool_maxsize': 3}
+
+def _orjson_response_hook(response, *args, **kwargs):
+    """requests response hook that makes response.json() parse with orjson"""
+    response.json = lambda **_: orjson.loads(response.content)
+    return response
+
+def _print_connected(profile, access_token):
+    """Show which account the access token belongs to"""
+    print(f"✅ Success! Connected to account:")
+    print(f"👤 Name: {profile['user_name']}")
+    print(f"🆔 User ID: {profile['user_id']}")
+    print(f"📧 Email: {profile.get('email', 'Not available')}")
+    print(f"🔑 Access Token: {access_token}")
+
+# Troubleshooting hints by Kite exception class
+KITE_ERROR_HINTS = {
+    TokenException: (
+        "The API key, secret or request_token was rejected",
+        "The credentials might still be encrypted or invalid, or the request_token expired",
+    ),
+    InputException: (
+        "Kite rejected the request - check the request_token and API secret",
+        "The credentials might still be encrypted or invalid",
+    ),
+    PermissionException: ("This API key is not permitted to access the account",),
+    NetworkException: ("Kite could not reach its backend - try again in a moment",),
+}
+
 def get_access_token(api_key, api_secret):
     """Generate access token with automatic error handling"""
 
@@ -101,7 +202,25 @@ def get_access_token(api_key, api_secret):
         print("-" * 40)
         print(f"Testing with API Key: {api_key[:10]}...")
 
-        kite = KiteConnect(api_key=api_key)
+        # This client (and its keep-alive pool) serves the login, the summary and the detailed view
+        kite = KiteConnect(api_key=api_key, pool=KITE_POOL)
+        if orjson is not None:
+            kite.reqsession.hooks['response'].append(_orjson_response_hook)
+
+        # Reuse today's token when it still works, skipping the login entirely
+        # Shared with start_real_trading; encrypted when ENCRYPTION_KEY is set
+        encryption_key = os.getenv('ENCRYPTION_KEY')
+        cached_token = load_cached_token(api_key, encryption_key)
+        if cached_token:
+            kite.set_access_token(cached_token)
+            try:
+                profile = kite.profile()
+                print("♻️ Using today's cached access token")
+                _print_connected(profile, cached_token)
+                return kite, profile
+            except KiteException:
+                print("ℹ️ Cached access token is no longer valid, logging in again")
+
         login_url = kite.login_url()
 
         print("✅ API Key appears valid - login URL generated")
@@ -118,103 +237,135 @@ def get_access_token(api_key, api_secret):
 
         # Generate session
         print("🔄 Generating access token...")
+        # Not retried: the request_token is single-use, so a retry after a
+        # lost response would fail even though the session was created
         data = kite.generate_session(request_token, api_secret=api_secret)
         access_token = data["access_token"]
 
         # Test the token
         kite.set_access_token(access_token)
-        profile = kite.profile()
+        profile = _with_retry(kite.profile)
 
-        print(f"✅ Success! Connected to account:")
-        print(f"👤 Name: {profile['user_name']}")
-        print(f"🆔 User ID: {profile['user_id']}")
-        print(f"📧 Email: {profile.get('email', 'Not available')}")
-        print(f"🔑 Access Token: {access_token}")
+        _print_connected(profile, access_token)
+        save_cached_token(api_key, access_token, encryption_key)
 
         return kite, profile
 
     except KiteException as e:
         print(f"❌ Kite API Error: {e}")
-        if "Invalid API credentials" in str(e):
-            print("💡 This suggests the API key/secret are incorrect")
-            print("💡 They might still be encrypted or invalid")
+        # The closest class with hints wins, so subclasses inherit their parent's
+        hints = next((KITE_ERROR_HINTS[cls] for cls in type(e).__mro__ if cls in KITE_ERROR_HINTS), ())
+        for hint in hints:
+            print(f"💡 {hint}")
         return None, None
     except Exception as e:
         print(f"❌ Error: {e}")
         return None, None
 
-def format_currency(amount):
-    """Format currency in Indian style"""
-    if amount >= 10000000:  # 1 crore
-        return f"₹{amount/10000000:.2f}Cr"
-    elif amount >= 100000:  # 1 lakh
-        return f"₹{amount/100000:.2f}L"
-    else:
-        return f"₹{amount:,.2f}"
+def write_block(lines):
+    """Write several report lines with a single write and flush"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+# Row status indicators, indexed by `pnl >= 0`
+STATUS_ICONS = ("🔴", "🟢")
+
+def _summarize(items, top_n=3, open_only=False):
+    """Count, total P&L and the top_n entries by absolute P&L in a single pass
+
+    With open_only, entries with zero quantity are skipped. Ties keep their
+    original order, as sorted(..., reverse=True)[:top_n] would.
+    """
+    count = 0
+    total = 0
+    top = []  # min-heap of (abs pnl, -index, item); the index keeps items from being compared
+    for index, item in enumerate(items):
+        if open_only and not item['quantity']:
+            continue
+        pnl = item['pnl']
+        count += 1
+        total += pnl
+        entry = (abs(pnl), -index, item)
+        if len(top) < top_n:
+            heapq.heappush(top, entry)
+        else:
+            heapq.heappushpop(top, entry)
+    return count, total, [item for _, _, item in sorted(top, reverse=True)]
+
+def _top_rows(items):
+    """One summary line per entry: truncated symbol, signed P&L and status icon"""
+    return [f"   {item['tradingsymbol'][:15]}: {item['pnl']:+.2f} {STATUS_ICONS[item['pnl'] >= 0]}"
+            for item in items]
 
 def display_quick_summary(kite):
-    """Display a quick summary of positions and margins"""
+    """Display a quick summary of positions and margins
 
-    print("\n" + "="*80)
-    print("📊 ACCOUNT QUICK SUMMARY")
-    print("="*80)
+    Returns the fetched responses keyed by API name so the detailed view can
+    reuse them; a call that failed is left out.
+    """
 
-    try:
-        # Get positions
-        positions = kite.positions()
-        net_positions = positions.get('net', [])
-        active_positions = [pos for pos in net_positions if pos['quantity'] != 0]
+    lines = ["\n" + "="*80, "📊 ACCOUNT QUICK SUMMARY", "="*80]
 
-        # Get holdings
-        holdings = kite.holdings()
+    # Independent round trips, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        pending = {name: pool.submit(getattr(kite, name))
+                   for name in ('positions', 'holdings', 'margins')}
 
-        # Get margins
-        margins = kite.margins()
-        equity = margins.get('equity', {})
-        available_cash = equity.get('available', {}).get('cash', 0)
+    data = {}
+    for name, future in pending.items():
+        try:
+            data[name] = future.result()
+        except Exception as e:
+            lines.append(f"❌ Error fetching {name}: {e}")
 
-        print(f"💰 Available Cash: {format_currency(available_cash)}")
-        print(f"📊 Active Positions: {len(active_positions)}")
-        print(f"💼 Holdings: {len(holdings) if holdings else 0}")
+    try:
+        net_positions = data.get('positions', {}).get('net', [])
+        holdings = data.get('holdings')
+        active_count, total_position_pnl, top_positions = _summarize(net_positions, open_only=True)
+        _, total_holding_pnl, top_holdings = _summarize(holdings or [])
+
+        if 'margins' in data:
+            equity = data['margins'].get('equity', {})
+            available_cash = equity.get('available', {}).get('cash', 0)
+            lines.append(f"💰 Available Cash: {format_currency(available_cash)}")
+        if 'positions' in data:
+            lines.append(f"📊 Active Positions: {active_count}")
+        if 'holdings' in data:
+            lines.append(f"💼 Holdings: {len(holdings) if holdings else 0}")
 
         # Calculate total P&L
-        total_position_pnl = sum(pos['pnl'] for pos in active_positions)
-        total_holding_pnl = sum(hold['pnl'] for hold in holdings) if holdings else 0
         total_pnl = total_position_pnl + total_holding_pnl
 
         if total_pnl != 0:
             pnl_status = "📈 PROFIT" if total_pnl > 0 else "📉 LOSS"
-            print(f"🎯 Total P&L: {format_currency(total_pnl)} {pnl_status}")
+            lines.append(f"🎯 Total P&L: {format_currency(total_pnl)} {pnl_status}")
 
         # Show top positions/holdings
-        if active_positions:
-            print(f"\n📊 Top Active Positions:")
-            for pos in sorted(active_positions, key=lambda x: abs(x['pnl']), reverse=True)[:3]:
-                symbol = pos['tradingsymbol'][:15]
-                pnl = pos['pnl']
-                pnl_indicator = "🟢" if pnl >= 0 else "🔴"
-                print(f"   {symbol}: {pnl:+.2f} {pnl_indicator}")
+        if top_positions:
+            lines.append(f"\n📊 Top Active Positions:")
+            lines.extend(_top_rows(top_positions))
 
         if holdings:
-            print(f"\n💼 Top Holdings:")
-            for hold in sorted(holdings, key=lambda x: abs(x['pnl']), reverse=True)[:3]:
-                symbol = hold['tradingsymbol'][:15]
-                pnl = hold['pnl']
-                pnl_indicator = "🟢" if pnl >= 0 else "🔴"
-                print(f"   {symbol}: {pnl:+.2f} {pnl_indicator}")
+            lines.append(f"\n💼 Top Holdings:")
+            lines.extend(_top_rows(top_holdings))
 
     except Exception as e:
-        print(f"❌ Error getting summary: {e}")
+        lines.append(f"❌ Error getting summary: {e}")
+
+    write_block(lines)
+    return data
 
 def main():
     """Main function"""
 
-    print("=" * 80)
-    print("🚀 SMART ZERODHA POSITION CHECKER")
-    print("=" * 80)
-    print("🔍 Automatically detects encrypted vs plain text credentials")
-    print("📊 Shows your positions, holdings, and account summary")
-    print("-" * 80)
+    write_block([
+        "=" * 80,
+        "🚀 SMART ZERODHA POSITION CHECKER",
+        "=" * 80,
+        "🔍 Automatically detects encrypted vs plain text credentials",
+        "📊 Shows your positions, holdings, and account summary",
+        "-" * 80,
+    ])
 
     try:
         # Try to get credentials (encrypted or plain)
@@ -236,20 +387,25 @@ def main():
             sys.exit(1)
 
         # Show quick summary
-        display_quick_summary(kite)
+        account_data = display_quick_summary(kite)
 
         # Offer detailed view
-        detailed = input(f"\n📋 Show detailed positions and holdings? (y/n): ").lower().startswith('y')
+        response = input(f"\n📋 Show detailed positions and holdings? (y/n): ").strip()
+        detailed = response[:1] in ('y', 'Y')
 
         if detailed:
-            # Import detailed display functions
-            from check_positions import display_positions, display_holdings, display_margins
-            display_positions(kite)
-            display_holdings(kite)
-            display_margins(kite)
+            # Import detailed display functions; they reuse the responses fetched above
+            from utils.check_positions import display_positions, display_holdings, display_margins
+            lines = []
+            for name, display in (('positions', display_positions),
+                                  ('holdings', display_holdings),
+                                  ('margins', display_margins)):
+                if name in account_data:
+                    display(account_data[name], lines)
+            write_block(lines)
 
         print(f"\n✅ Data retrieved successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("💡 Save your access token for future use (valid until end of trading day)")
+        print(f"💡 Access token cached in {TOKEN_CACHE_DIR} (valid until end of trading day)")
         print("🔄 Run this script anytime to check your positions")
 
     except KeyboardInterrupt:
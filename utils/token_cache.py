@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Access Token Cache
+==================
+
+Kite access tokens stay valid for the trading day, so scripts cache them per
+API key and reuse them on later runs the same day. Each key gets its own file
+under ~/.kite_cache named by the SHA-256 of the key (the key itself is never
+written to disk); the token is Fernet-encrypted when an encryption key is
+given, and the file is readable only by the owner.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from functools import lru_cache
+from typing import Optional
+from datetime import datetime
+
+TOKEN_CACHE_DIR = Path.home() / '.kite_cache'
+
+class _RFernetAdapter:
+    """rfernet.Fernet behind cryptography's bytes-in, bytes-out Fernet interface
+
+    rfernet takes the key and tokens as str and returns str from encrypt().
+    """
+
+    def __init__(self, key):
+        from rfernet import Fernet
+        self._fernet = Fernet(key.decode() if isinstance(key, bytes) else key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(data).encode()
+
+    def decrypt(self, token) -> bytes:
+        return self._fernet.decrypt(token.decode() if isinstance(token, bytes) else token)
+
+@lru_cache(maxsize=None)
+def fernet_class():
+    """Return the Fernet implementation, preferring the Rust-backed rfernet"""
+    try:
+        import rfernet  # noqa: F401
+    except ImportError:
+        from cryptography.fernet import Fernet
+        return Fernet
+    return _RFernetAdapter
+
+def token_cache_path(api_key: str) -> Path:
+    """Cache file for an API key"""
+    return TOKEN_CACHE_DIR / f"{hashlib.sha256(api_key.encode()).hexdigest()}.json"
+
+def load_cached_token(api_key: str, encryption_key: Optional[str] = None) -> Optional[str]:
+    """Return the access token cached today for this API key, if any"""
+    try:
+        with open(token_cache_path(api_key), 'r') as f:
+            cached = json.load(f)
+
+        # Kite tokens expire daily - ignore anything issued before today
+        if not cached.get('issued_at', '').startswith(datetime.now().strftime('%Y-%m-%d')):
+            return None
+
+        access_token = cached['access_token']
+        if cached.get('encrypted'):
+            if not encryption_key:
+                return None
+            access_token = fernet_class()(encryption_key.encode()).decrypt(access_token.encode()).decode()
+
+        return access_token
+
+    except Exception:
+        return None
+
+def save_cached_token(api_key: str, access_token: str, encryption_key: Optional[str] = None):
+    """Persist access token atomically with owner-only permissions"""
+    try:
+        encrypted = False
+        if encryption_key:
+            access_token = fernet_class()(encryption_key.encode()).encrypt(access_token.encode()).decode()
+            encrypted = True
+
+        TOKEN_CACHE_DIR.mkdir(mode=0o700, exist_ok=True)
+        cache_path = token_cache_path(api_key)
+        tmp_path = cache_path.with_suffix('.tmp')
+
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'access_token': access_token,
+                'encrypted': encrypted,
+                'issued_at': datetime.now().isoformat()
+            }, f)
+        os.replace(tmp_path, cache_path)
+
+    except Exception as e:
+        print(f"⚠️ Could not cache access token: {e}")